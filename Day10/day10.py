@@ -2,7 +2,8 @@
 
 from __future__ import annotations
 
-from typing import List, Set
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Tuple
 
 
 def read_input(filepath: str) -> List[int]:
@@ -26,16 +27,8 @@ def solve_part1(filepath: str) -> int:
     """
     nums = read_input(filepath)
 
-    one_diff = 1  # charger has rating of 0 and first adapter is 1
-    three_diff = 1  # device has rating +3 of last (last is 19)
-    for i in range(len(nums) - 1):
-        diff = nums[i + 1] - nums[i]
-        if diff == 1:
-            one_diff += 1
-        elif diff == 3:
-            three_diff += 1
-
-    return one_diff * three_diff
+    differences = difference_histogram(nums)
+    return differences.get(1, 0) * differences.get(3, 0)
 
 
 def solve_part2(filepath: str) -> int:
@@ -46,42 +39,146 @@ def solve_part2(filepath: str) -> int:
     >>> solve_part2('test2.txt')
     19208
     """
-    nums = read_input(filepath
-                      )
-    device_end = nums[-1] + 3
-    nums_set = set(nums)
+    nums = read_input(filepath)
+
+    return arrangement_summary(nums)[0]
 
-    return memorized_sum_branches(nums_set, 0, device_end)
 
+def difference_histogram(adapters: List[int], max_jump: int = 3) -> Dict[int, int]:
+    """Returns how many times each joltage difference occurs in the chain from the outlet to the device.
 
-def memorized_sum_branches(all_nums: Set[int], start_num: int, max_num: int) -> int:
-    """Recursively counts number of possible branches with memorization.
+    The outlet is 0 and the device is max_jump above the last adapter.
+
+    >>> difference_histogram([1, 4, 5, 6, 7, 10, 11, 12, 15, 16, 19])
+    {1: 7, 3: 5}
     """
-    branches = [-1 for _ in range(max_num)]
+    return difference_runs(adapters, max_jump)[0]
 
-    return sum_branches(all_nums, start_num, max_num, branches)
 
+def difference_runs(adapters: List[int], max_jump: int = 3) -> Tuple[Dict[int, int], Dict[int, int]]:
+    """Returns (joltage difference histogram, run length histogram) for the sorted adapters in one pass.
 
-def sum_branches(all_nums: Set[int], start_num: int, max_num: int, cached_branches: List[int]) -> int:
-    """Recursively counts number of possible branches.
-    """
-    if start_num + 3 == max_num:
-        return 1
+    The run length histogram maps each length of a run of consecutive 1-jolt
+    differences to how many such runs there are. The outlet is 0 and the device
+    is max_jump above the last adapter.
 
-    if cached_branches[start_num] == -1:
-        jumps = [None, None, None]
-        if start_num + 1 in all_nums:
-            jumps[0] = sum_branches(all_nums, start_num + 1, max_num, cached_branches)
+    >>> difference_runs([1, 4, 5, 6, 7, 10, 11, 12, 15, 16, 19])
+    ({1: 7, 3: 5}, {1: 2, 3: 1, 2: 1})
+    """
+    differences = {}  # Dict[int, int]
+    runs = {}  # Dict[int, int]
+    run = 0
+    previous = 0
+    for adapter in adapters + [(adapters[-1] if adapters else 0) + max_jump]:
+        difference = adapter - previous
+        differences[difference] = differences.get(difference, 0) + 1
+        if difference == 1:
+            run += 1
+        else:
+            if run:
+                runs[run] = runs.get(run, 0) + 1
+            run = 0
+        previous = adapter
+
+    return differences, runs
+
+
+def count_arrangements(adapters: List[int], modulus: Optional[int] = None, max_jump: int = 3) -> int:
+    """Returns the number of ways to chain the outlet (0) to the device using the sorted adapters.
+
+    Iterates over the adapters once, keeping only the (joltage, ways) of the last
+    max_jump adapters, since no adapter can connect to anything more than
+    max_jump jolts below it. If modulus is given, the count is returned modulo it.
+
+    Preconditions:
+        - adapters == sorted(set(adapters))
+        - all(n > 0 for n in adapters)
+        - max_jump >= 1
+
+    >>> count_arrangements([1, 4, 5, 6, 7, 10, 11, 12, 15, 16, 19])
+    8
+    >>> count_arrangements(list(range(1, 101)), modulus=1000)
+    639
+    >>> count_arrangements([1, 2, 3, 4], max_jump=2)
+    5
+    """
+    window = deque([(0, 1)], maxlen=max_jump)  # (joltage, number of ways to reach it)
+    for adapter in adapters:
+        ways = sum(w for joltage, w in window if adapter - joltage <= max_jump)
+        if modulus is not None:
+            ways %= modulus
+        window.append((adapter, ways))
+
+    # The device is always max_jump above the last adapter, so it connects only to that one
+    return window[-1][1]
+
+
+def run_multipliers(lengths: Iterable[int], max_jump: int = 3,
+                    modulus: Optional[int] = None) -> Dict[int, int]:
+    """Returns the number of ways to cross a run of k consecutive 1-jolt differences, for each k in lengths.
+
+    Both ends of the run are fixed, so this counts the compositions of k into parts
+    of at most max_jump (the tribonacci numbers when max_jump is 3). Only the last
+    max_jump counts are kept while stepping up to the longest run, and each is
+    reduced modulo modulus if one is given.
+
+    >>> run_multipliers([1, 2, 3, 4, 5, 6])
+    {1: 1, 2: 2, 3: 4, 4: 7, 5: 13, 6: 24}
+    >>> run_multipliers([6, 0], modulus=10)
+    {0: 1, 6: 4}
+    """
+    wanted = set(lengths)
+    multipliers = {}  # Dict[int, int]
+    if 0 in wanted:
+        multipliers[0] = 1
+
+    window = deque([1], maxlen=max_jump)  # counts for the last max_jump run lengths
+    for k in range(1, max(wanted, default=0) + 1):
+        ways = sum(window)
+        if modulus is not None:
+            ways %= modulus
+        window.append(ways)
+        if k in wanted:
+            multipliers[k] = ways
+
+    return multipliers
+
+
+def arrangement_summary(adapters: List[int], max_jump: int = 3,
+                        modulus: Optional[int] = None) -> Tuple[int, Dict[int, int]]:
+    """Returns (number of arrangements, joltage difference histogram) for the sorted adapters.
+
+    The histogram and the lengths of runs of 1-jolt differences are gathered in one
+    pass by difference_runs. When every difference is 1 or max_jump, each max_jump
+    gap must be used, so the count is the product of run_multipliers over the runs;
+    otherwise this falls back to count_arrangements.
+
+    Preconditions:
+        - adapters == sorted(set(adapters))
+        - all(n > 0 for n in adapters)
+        - max_jump >= 1
+
+    >>> arrangement_summary([1, 4, 5, 6, 7, 10, 11, 12, 15, 16, 19])
+    (8, {1: 7, 3: 5})
+    >>> arrangement_summary([2, 3, 5], max_jump=3)
+    (3, {2: 2, 1: 1, 3: 1})
+    """
+    differences, runs = difference_runs(adapters, max_jump)
 
-        if start_num + 2 in all_nums:
-            jumps[1] = sum_branches(all_nums, start_num + 2, max_num, cached_branches)
+    if any(difference > max_jump for difference in differences):
+        return 0, differences
 
-        if start_num + 3 in all_nums:
-            jumps[2] = sum_branches(all_nums, start_num + 3, max_num, cached_branches)
+    if not all(difference in (1, max_jump) for difference in differences):
+        return count_arrangements(adapters, modulus, max_jump), differences
 
-        cached_branches[start_num] = sum([jump for jump in jumps if jump is not None])
+    multipliers = run_multipliers(runs, max_jump, modulus)
+    arrangements = 1
+    for length, times in runs.items():
+        arrangements *= pow(multipliers[length], times, modulus)
+        if modulus is not None:
+            arrangements %= modulus
 
-    return cached_branches[start_num]
+    return arrangements, differences
 
 
 if __name__ == '__main__':
@@ -2,7 +2,13 @@
 
 from __future__ import annotations
 
-from typing import List
+from typing import List, Tuple
+
+# Map layout characters to 1 for seats / occupied seats and 0 otherwise
+SEAT_TRANSLATION = bytes.maketrans(b'.L#', b'\x00\x01\x01')
+OCCUPIED_TRANSLATION = bytes.maketrans(b'.L#', b'\x00\x00\x01')
+SEAT_BITS = str.maketrans('.L#', '011')
+OCCUPIED_BITS = str.maketrans('.L#', '001')
 
 
 def read_input(filepath: str) -> List[str]:
@@ -12,58 +18,65 @@ def read_input(filepath: str) -> List[str]:
         return input_file.read().strip().split('\n')
 
 
+def rule_table(tolerance: int) -> bytes:
+    """Return a translation table from a cell's state code to whether it is occupied next round.
+
+    A cell's code is (occupied neighbours) + 16 * (occupied) + 32 * (is a seat).
+    Empty seats fill up with no occupied neighbours, and occupied seats empty
+    once at least tolerance neighbours are occupied.
+    """
+    table = bytearray(256)
+    for count in range(9):
+        table[32 + count] = count == 0
+        table[48 + count] = count < tolerance
+
+    return bytes(table)
+
+
+def flat_layout(rows: List[str]) -> Tuple[int, bytes, bytes]:
+    """Return (padded width, seat array, occupied array) for the layout.
+
+    The layout is bordered with floor and flattened row by row into bytes holding
+    1 for a seat (or occupied seat) and 0 otherwise.
+    """
+    width = len(rows[0]) + 2
+    border = '.' * width
+    flat = ''.join([border] + ['.' + row + '.' for row in rows] + [border]).encode()
+
+    return width, flat.translate(SEAT_TRANSLATION), flat.translate(OCCUPIED_TRANSLATION)
+
+
+def step_adjacent(seats: bytes, occupied: bytes, width: int, table: bytes) -> bytes:
+    """Return the occupied array after one round of the adjacent-seat rules.
+
+    Neighbour counts are the sum of the 8 shifted copies of the occupied array.
+    Each copy is read as one big integer with a byte per cell; no count exceeds
+    8, so the byte lanes never carry into each other and a single integer sum
+    counts every cell at once. The state codes are then mapped through table.
+    """
+    start, end = width + 1, len(occupied) - width - 1
+    shifts = (-width - 1, -width, -width + 1, -1, 1, width - 1, width, width + 1)
+
+    codes = sum(int.from_bytes(occupied[start + shift:end + shift], 'big') for shift in shifts)
+    codes += 16 * int.from_bytes(occupied[start:end], 'big') + 32 * int.from_bytes(seats[start:end], 'big')
+
+    return occupied[:start] + codes.to_bytes(end - start, 'big').translate(table) + occupied[end:]
+
+
 def solve_part1(filepath: str) -> int:
     """Returns solution to Day 11 Part 1 problem.
 
     >>> solve_part1('test1.txt')
     37
     """
-    rows = read_input(filepath)
-    rows.insert(0, '.' * len(rows[0]))
-    rows.append('.' * len(rows[0]))
-    for i in range(0, len(rows)):
-        rows[i] = '.' + rows[i] + '.'
+    width, seats, occupied = flat_layout(read_input(filepath))
+    table = rule_table(4)
 
-    original_seating = rows
     while True:
-        new_seating = original_seating.copy()
-        for i in range(1, len(original_seating) - 1):
-            new_string = ['.']
-            for j in range(1, len(original_seating[i]) - 1):
-                if original_seating[i][j] != '.':
-                    new_string.append(check_around([row[j - 1: j + 2] for row in original_seating[i - 1: i + 2]]))
-                else:
-                    new_string.append('.')
-            new_string.append('.')
-            new_seating[i] = ''.join(new_string)
-
-        if new_seating == original_seating:
-            return sum(sum(seat == '#' for seat in row) for row in new_seating)
-        else:
-            original_seating = new_seating
-
-
-def check_around(seats: List[str]) -> str:
-    """Returns the new middle seat character.
-
-    Preconditions:
-        - len(seats) == 3
-        - all(len(row) == 3 for row in seats)
-    """
-    if seats[1][1] == '#':  # occupied
-        if sum(sum(seat == '#' for seat in row) for row in seats) - 1 >= 4:
-            return 'L'
-        else:
-            return '#'
-
-    elif seats[1][1] == 'L':  # empty
-        if sum(sum(seat == '#' for seat in row) for row in seats) == 0:
-            return '#'
-        else:
-            return 'L'
-
-    else:
-        return seats[1][1]
+        new_occupied = step_adjacent(seats, occupied, width, table)
+        if new_occupied == occupied:
+            return occupied.count(1)
+        occupied = new_occupied
 
 
 def solve_part2(filepath: str) -> int:
@@ -72,99 +85,213 @@ def solve_part2(filepath: str) -> int:
     >>> solve_part2('test1.txt')
     26
     """
-    rows = read_input(filepath)
-    rows.insert(0, 'x' * len(rows[0]))
-    rows.append('x' * len(rows[0]))
-    for i in range(0, len(rows)):
-        rows[i] = 'x' + rows[i] + 'x'
+    width, seats, occupied = flat_layout(read_input(filepath))
+    seat_cells, visible = visible_seat_index(seats, width)
+    table = rule_table(5)
+
+    # Occupied state of each seat in seat_cells order, then the always-empty sentinel
+    occupied = bytes(occupied[cell] for cell in seat_cells) + b'\x00'
+    while True:
+        new_occupied = step_visible(occupied, visible, table)
+        if new_occupied == occupied:
+            return occupied.count(1)
+        occupied = new_occupied
+
+
+def visible_seat_index(seats: bytes, width: int) -> Tuple[List[int], List[List[int]]]:
+    """Return (seat cells, visible seats) for a flat layout, computed once per layout.
+
+    seat_cells lists the flat position of every seat, and seats are numbered by
+    their position in it. visible has one list per direction giving, for each
+    seat number, the number of the first seat visible in that direction, or
+    len(seat_cells) if there is none (the caller keeps that slot always empty).
+
+    Each direction is filled in one sweep ordered so that the cell one step in
+    that direction is always resolved first.
+
+    >>> width, seats, _ = flat_layout(['L.#', '...', 'L.L'])
+    >>> visible_seat_index(seats, width)[1][1]  # N
+    [4, 4, 0, 1]
+    """
+    n = len(seats)
+    height = n // width
+    seat_cells = [cell for cell in range(n) if seats[cell]]
+    sentinel = len(seat_cells)
+    number = {cell: k for k, cell in enumerate(seat_cells)}  # Dict[int, int]
+
+    # Border cells are floor with nothing visible beyond them, so they keep the sentinel
+    interior = [row * width + col for row in range(1, height - 1) for col in range(1, width - 1)]
+
+    visible = []
+    for shift in (-width - 1, -width, -width + 1, -1, 1, width - 1, width, width + 1):
+        nearest = [sentinel] * n
+        for cell in (interior if shift < 0 else reversed(interior)):
+            neighbour = cell + shift
+            nearest[cell] = number[neighbour] if seats[neighbour] else nearest[neighbour]
+        visible.append([nearest[cell] for cell in seat_cells])
+
+    return seat_cells, visible
+
+
+def step_visible(occupied: bytes, visible: List[List[int]], table: bytes) -> bytes:
+    """Return the occupied seats after one round of the line-of-sight rules.
+
+    occupied holds one byte per seat followed by an always-empty sentinel byte.
+    Each direction's neighbours are gathered through the visible index and summed
+    in byte lanes of one big integer, as in step_adjacent.
+
+    >>> width, seats, occupied = flat_layout(read_input('test2.txt'))
+    >>> seat_cells, visible = visible_seat_index(seats, width)
+    >>> occupied = bytes(occupied[cell] for cell in seat_cells) + b'\\x00'
+    >>> empty = seat_cells.index(5 * width + 4)
+    >>> sum(occupied[direction[empty]] for direction in visible)
+    8
+    """
+    n = len(occupied) - 1
+    codes = sum(int.from_bytes(bytes(map(occupied.__getitem__, direction)), 'big') for direction in visible)
+    codes += 16 * int.from_bytes(occupied[:n], 'big') + 32 * int.from_bytes(b'\x01' * n, 'big')
+
+    return codes.to_bytes(n, 'big').translate(table) + b'\x00'
+
+
+def adjacent_seat_neighbours(seats: bytes, width: int) -> Tuple[List[int], List[List[int]]]:
+    """Return (seat cells, neighbours) where neighbours[k] lists the seat numbers adjacent to seat k.
+
+    Seats are numbered by their position in seat_cells, as in visible_seat_index.
+    """
+    seat_cells = [cell for cell in range(len(seats)) if seats[cell]]
+    number = {cell: k for k, cell in enumerate(seat_cells)}  # Dict[int, int]
+    shifts = (-width - 1, -width, -width + 1, -1, 1, width - 1, width, width + 1)
+
+    neighbours = [[number[cell + shift] for shift in shifts if seats[cell + shift]] for cell in seat_cells]
+
+    return seat_cells, neighbours
+
+
+def visible_seat_neighbours(seats: bytes, width: int) -> Tuple[List[int], List[List[int]]]:
+    """Return (seat cells, neighbours) where neighbours[k] lists the seat numbers visible from seat k.
+    """
+    seat_cells, visible = visible_seat_index(seats, width)
+    sentinel = len(seat_cells)
+
+    neighbours = [[seat for seat in seen if seat != sentinel] for seen in zip(*visible)]
+
+    return seat_cells, neighbours
+
 
-    original_seating = rows
+def simulate_incremental(occupied: bytearray, neighbours: List[List[int]],
+                         tolerance: int) -> List[int]:
+    """Run the seating rules on occupied (one byte per seat) in place until no seat changes.
+
+    Returns the number of seats that changed in each round. Each seat's occupied
+    neighbour count is kept up to date as seats change, and a round only
+    re-evaluates the seats that changed or had a neighbour change in the
+    previous round; the layout is stable once no seat changes.
+
+    >>> width, seats, occupied = flat_layout(read_input('test1.txt'))
+    >>> seat_cells, neighbours = adjacent_seat_neighbours(seats, width)
+    >>> occupied = bytearray(occupied[cell] for cell in seat_cells)
+    >>> simulate_incremental(occupied, neighbours, 4)
+    [71, 51, 31, 21, 7]
+    >>> occupied.count(1)
+    37
+    >>> seat_cells, neighbours = visible_seat_neighbours(seats, width)
+    >>> occupied = bytearray(len(seat_cells))
+    >>> len(simulate_incremental(occupied, neighbours, 5)), occupied.count(1)
+    (6, 26)
+    """
+    counts = [sum(occupied[seat] for seat in seen) for seen in neighbours]
+    dirty = range(len(neighbours))  # Iterable[int]
+
+    changes_per_round = []
     while True:
-        new_seating = original_seating.copy()
-        for i in range(1, len(original_seating) - 1):
-            new_string = ['x']
-            for j in range(1, len(original_seating[i]) - 1):
-                if original_seating[i][j] != '.':
-                    new_string.append(check_around_part2(original_seating, i, j))
-                else:
-                    new_string.append('.')
-            new_string.append('x')
-            new_seating[i] = ''.join(new_string)
-
-        if new_seating == original_seating:
-            return sum(sum(seat == '#' for seat in row) for row in new_seating)
-        else:
-            original_seating = new_seating
-
-
-def check_around_part2(seats: List[str], row: int, col: int) -> str:
-    """Returns the new middle seat character.
-
-    Seats should be all the seats on the ferry.
+        changed = [seat for seat in dirty
+                   if (counts[seat] >= tolerance if occupied[seat] else counts[seat] == 0)]
+        if not changed:
+            return changes_per_round
+
+        changes_per_round.append(len(changed))
+        dirty = set(changed)
+        for seat in changed:
+            occupied[seat] ^= 1
+            delta = 1 if occupied[seat] else -1
+            for neighbour in neighbours[seat]:
+                counts[neighbour] += delta
+            dirty.update(neighbours[seat])
+
+
+def bitboard_layout(rows: List[str]) -> Tuple[List[int], List[int]]:
+    """Return (seat rows, occupied rows) as one integer bitboard per row, with bit j for column j.
+
+    >>> bitboard_layout(['L.#', '#.L'])
+    ([5, 5], [4, 1])
     """
-    DIRECTIONS = {'NW', 'N', 'NE', 'W', 'E', 'SW', 'S', 'SE'}
-    # occupation = [first_visible_occupied(seats, direction, row, col) for direction in DIRECTIONS]
-    if seats[row][col] == '#':  # occupied
-        if sum([first_visible_occupied(seats, direction, row, col, True) for direction in DIRECTIONS]) >= 5:
-            return 'L'
-        else:
-            return '#'
-
-    elif seats[row][col] == 'L':  # empty
-        if sum([first_visible_occupied(seats, direction, row, col, True) for direction in DIRECTIONS]) == 0:
-            return '#'
-        else:
-            return 'L'
-
-    else:
-        return seats[row][col]
-
-
-def first_visible_occupied(seats: List[str], direction: str, row: int, col: int, original: bool) -> bool:
-    """Return whether the first visible seat is occupied.
-
-    Original marks whether this current seat should be ignored.
-
-    Possible directions ([.] marks the current seat):
-        - [NW] [N] [NE]
-        - [W]  [.] [E]
-        - [SW] [S] [SE]
-
-    Preconditions:
-        - all(len(row) == len(row[0]) for row in seats)
-        - 0 <= x <= len(seats[0]) - 1
-        - 0 <= y <= len(seats) - 1
+    seats = []
+    occupied = []
+    for row in rows:
+        seats.append(int(row[::-1].translate(SEAT_BITS), 2))
+        occupied.append(int(row[::-1].translate(OCCUPIED_BITS), 2))
+
+    return seats, occupied
+
+
+def neighbour_count_planes(above: int, row: int, below: int, full: int) -> List[int]:
+    """Return the occupied-neighbour count of every column as 4 bit planes (1s, 2s, 4s, 8s).
+
+    The 8 neighbour bitboards are added with ripple-carry adders, so every column
+    of the row is counted at once with bitwise operations.
+    """
+    planes = [0, 0, 0, 0]
+    for neighbours in ((above << 1) & full, above, above >> 1, (row << 1) & full,
+                       row >> 1, (below << 1) & full, below, below >> 1):
+        carry = neighbours
+        for k in range(4):
+            planes[k], carry = planes[k] ^ carry, planes[k] & carry
+            if not carry:
+                break
+
+    return planes
+
+
+def step_bitboard(seats: List[int], occupied: List[int], width: int, tolerance: int) -> List[int]:
+    """Return the occupied rows after one round of the adjacent-seat rules on bitboards.
+    """
+    full = (1 << width) - 1
+
+    new_occupied = []
+    for i in range(len(seats)):
+        above = occupied[i - 1] if i > 0 else 0
+        below = occupied[i + 1] if i + 1 < len(occupied) else 0
+        planes = neighbour_count_planes(above, occupied[i], below, full)
+
+        none = full & ~(planes[0] | planes[1] | planes[2] | planes[3])
+        # Columns whose count is one of the values that empty a seat
+        crowded = 0
+        for value in range(tolerance, 9):
+            equal = full
+            for k in range(4):
+                equal &= planes[k] if value >> k & 1 else ~planes[k]
+            crowded |= equal
+
+        new_occupied.append((seats[i] & ~occupied[i] & none) | (occupied[i] & ~crowded))
+
+    return new_occupied
+
+
+def simulate_bitboard(rows: List[str], tolerance: int = 4) -> int:
+    """Return the number of occupied seats once the adjacent-seat rules stop changing the layout.
+
+    >>> simulate_bitboard(read_input('test1.txt'))
+    37
     """
-    if not original:
-        if seats[row][col] == 'x' or seats[row][col] == 'L':
-            return False
-        elif seats[row][col] == '#':
-            return True
-
-    if direction == 'NW':
-        row -= 1
-        col -= 1
-    elif direction == 'N':
-        row -= 1
-    elif direction == 'NE':
-        row -= 1
-        col += 1
-    elif direction == 'W':
-        col -= 1
-    elif direction == 'E':
-        col += 1
-    elif direction == 'SW':
-        row += 1
-        col -= 1
-    elif direction == 'S':
-        row += 1
-    elif direction == 'SE':
-        row += 1
-        col += 1
-    else:
-        print('rip')
-
-    return first_visible_occupied(seats, direction, row, col, False)
+    seats, occupied = bitboard_layout(rows)
+    width = len(rows[0])
+
+    while True:
+        new_occupied = step_bitboard(seats, occupied, width, tolerance)
+        if new_occupied == occupied:
+            return sum(bin(row).count('1') for row in occupied)
+        occupied = new_occupied
 
 
 if __name__ == '__main__':
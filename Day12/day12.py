@@ -3,7 +3,10 @@
 from __future__ import annotations
 
 import logging
-from typing import List, Tuple
+from functools import partial
+from itertools import accumulate
+from multiprocessing import Pool
+from typing import Callable, List, Optional, Tuple
 
 DIRECTIONS_LETTER = {'N': 90,
                      'E': 0,
@@ -13,6 +16,20 @@ DIRECTIONS_DEGREES = {90: 'N',
                       0: 'E',
                       270: 'S',
                       180: 'W'}
+# Dict[int, Tuple[int, int]]: (cos, sin) of each counterclockwise rotation
+ROTATIONS = {0: (1, 0),
+             90: (0, 1),
+             180: (-1, 0),
+             270: (0, -1)}
+
+# Opcodes used by decode_log: directions are heading indexes, then turns and forward
+ACTION_CODES = {'E': 0, 'N': 1, 'W': 2, 'S': 3, 'L': 4, 'R': 5, 'F': 6}
+TURN_LEFT, TURN_RIGHT, FORWARD = 4, 5, 6
+# Unit (x, y) vector of each heading index
+UNIT_VECTORS = [(1, 0), (0, 1), (-1, 0), (0, -1)]
+
+# Handler for one opcode: (state, opcode, value) -> new state
+Action = Callable[[tuple, int, int], tuple]
 
 
 def read_input(filepath: str) -> List[str]:
@@ -22,87 +39,117 @@ def read_input(filepath: str) -> List[str]:
         return input_file.read().strip().split('\n')
 
 
+def navigate(opcodes: List[int], values: List[int], actions: List[Action], state: tuple) -> tuple:
+    """Return the state after applying every decoded instruction through the actions dispatch table.
+
+    Each opcode selects its handler from actions, which maps the current state
+    and the instruction's value to the new state. Debug logging is checked once
+    up front and formatted lazily, so it costs nothing per instruction when disabled.
+    """
+    debug = logging.getLogger().isEnabledFor(logging.DEBUG)
+    for opcode, value in zip(opcodes, values):
+        if debug:
+            logging.debug('%s -- %s: %s', state, opcode, value)
+
+        state = actions[opcode](state, opcode, value)
+
+    return state
+
+
+def decode_log(instructions: List[str]) -> Tuple[List[int], List[int]]:
+    """Return the opcodes and values of a ship's log.
+
+    Opcodes 0-3 are the directions E, N, W, S (the heading index, in 90 degree
+    steps counterclockwise from east), followed by L, R and F. Instructions with
+    an unknown action are logged and skipped.
+
+    >>> decode_log(['F10', 'N3', 'R90'])
+    ([6, 1, 5], [10, 3, 90])
+    """
+    opcodes = []
+    values = []
+    for instruction in instructions:
+        opcode = ACTION_CODES.get(instruction[0])
+        if opcode is None:
+            logging.warning('Invalid movement command %r.', instruction)
+            continue
+
+        opcodes.append(opcode)
+        values.append(int(instruction[1:]))
+
+    return opcodes, values
+
+
 def solve_part1(filepath: str) -> int:
     """Returns solution to Day 12 Part 1 problem.
 
     >>> solve_part1('test1.txt')
     25
     """
-    instructions = read_input(filepath)
+    return navigate_log(read_input(filepath))
 
-    facing = 'E'
-    x, y = 0, 0
-    for instruction in instructions:
-        direction = instruction[0]
-        value = int(instruction[1:])
 
-        logging.debug(f'({x}, {y}) -- {direction}: {value}')
+def log_distance_ship(opcodes: List[int], values: List[int]) -> int:
+    """Return the Manhattan distance the ship ends up from the start, following the Part 1 rules.
+
+    The heading before every instruction is a running sum of the turns (in
+    quarter turns, mod 4), so each move is looked up directly in UNIT_VECTORS
+    instead of simulating the ship's state.
 
-        if direction == 'F':
-            x, y = move_ship(x, y, facing, value)
-        elif direction in {'L', 'R'}:
-            facing = turn_ship(facing, direction, value)
-        elif direction in {'N', 'S', 'E', 'W'}:
-            x, y = move_ship(x, y, direction, value)
-        else:
-            logging.warning('Invalid movement command.')
+    >>> log_distance_ship(*decode_log(read_input('test1.txt')))
+    25
+    """
+    quarter_turns = [0] * len(opcodes)
+    for i in range(len(opcodes)):
+        if opcodes[i] == TURN_LEFT:
+            quarter_turns[i] = values[i] // 90
+        elif opcodes[i] == TURN_RIGHT:
+            quarter_turns[i] = -values[i] // 90
+    headings = [heading % 4 for heading in accumulate(quarter_turns)]
+
+    moves = [(opcodes[i] if opcodes[i] < 4 else headings[i], values[i])
+             for i in range(len(opcodes)) if opcodes[i] < 4 or opcodes[i] == FORWARD]
+    x = sum(value * UNIT_VECTORS[heading][0] for heading, value in moves)
+    y = sum(value * UNIT_VECTORS[heading][1] for heading, value in moves)
 
     return abs(x) + abs(y)
 
 
-def turn_ship(facing: str, direction: str, degrees: int) -> str:
-    """Returns the new direction based on the current direction and the degrees.
+def rotate(x: int, y: int, degrees: int) -> Tuple[int, int]:
+    """Return the vector (x, y) rotated counterclockwise by degrees, using a lookup table.
 
     Preconditions:
-        - len(facing) == 1
-        - direction in {'L', 'R'}
         - degrees % 90 == 0
-        - degrees >= 0
 
-    >>> turn_ship('E', 'L', 90)
-    'N'
-    >>> turn_ship('W', 'R', 180)
-    'E'
+    >>> rotate(10, 1, 90)
+    (-1, 10)
+    >>> rotate(10, 1, -90)
+    (1, -10)
+    >>> rotate(10, 1, 900)
+    (-10, -1)
     """
-    deg = DIRECTIONS_LETTER[facing]
-    direc = 1 if direction == 'L' else -1
+    cos, sin = ROTATIONS[degrees % 360]
 
-    deg += direc * degrees
-    while deg < 0:
-        deg += 360
-    while deg >= 360:
-        deg -= 360
+    return x * cos - y * sin, x * sin + y * cos
 
-    return DIRECTIONS_DEGREES[deg]
 
-
-def move_ship(x: int, y: int, direction: str, value: int) -> Tuple[int, int]:
-    """Return the new x and y incremented by the given direction and value.
+def move(x: int, y: int, heading: int, value: int) -> Tuple[int, int]:
+    """Return the new x and y moved value units along heading (an index into UNIT_VECTORS).
 
     Preconditions:
-        - len(direction) == 1
+        - 0 <= heading < 4
         - value >= 0
-        - direction in {'N', 'S', 'E', 'W'}
 
-    >>> move_ship(0, 0, 'N', 10)
+    >>> move(0, 0, ACTION_CODES['N'], 10)
     (0, 10)
-    >>> move_ship(0, 0, 'S', 10)
+    >>> move(0, 0, ACTION_CODES['S'], 10)
     (0, -10)
-    >>> move_ship(0, 0, 'W', 10)
+    >>> move(0, 0, ACTION_CODES['W'], 10)
     (-10, 0)
     """
-    if direction == 'N':
-        y += value
-    elif direction == 'E':
-        x += value
-    elif direction == 'S':
-        y -= value
-    elif direction == 'W':
-        x -= value
-    else:
-        logging.warning(f"Direction '{direction}' not valid.")
+    d_x, d_y = UNIT_VECTORS[heading]
 
-    return x, y
+    return x + d_x * value, y + d_y * value
 
 
 def solve_part2(filepath: str) -> int:
@@ -111,28 +158,38 @@ def solve_part2(filepath: str) -> int:
     >>> solve_part2('test1.txt')
     286
     """
-    instructions = read_input(filepath)
+    return navigate_log(read_input(filepath), waypoint=True)
 
-    facing = 'E'
-    s_x, s_y = 0, 0  # ship
-    w_x, w_y = s_x + 10, s_y + 1  # waypoint
-    for instruction in instructions:
-        direction = instruction[0]
-        value = int(instruction[1:])
 
-        logging.debug(f'(SHIP: {s_x}, {s_y}), WAY: ({w_x}, {w_y}) -- {direction}: {value}')
+def waypoint_forward(state: Tuple[int, int, int, int, str], opcode: int,
+                     value: int) -> Tuple[int, int, int, int, str]:
+    """Return the (ship_x, ship_y, way_x, way_y, facing) state after moving to the waypoint value times.
+    """
+    s_x, s_y, w_x, w_y, facing = state
+    s_x, s_y, w_x, w_y = move_ship_and_way(s_x, s_y, w_x, w_y, value)
 
-        if direction == 'F':
-            for _ in range(value):
-                s_x, s_y, w_x, w_y = move_ship_and_way(s_x, s_y, w_x, w_y)
-        elif direction in {'L', 'R'}:
-            facing, w_x, w_y = turn_ship_and_way(s_x, s_y, w_x, w_y, facing, direction, value)
-        elif direction in {'N', 'S', 'E', 'W'}:
-            w_x, w_y = move_way(w_x, w_y, direction, value)
-        else:
-            logging.warning('Invalid movement command.')
+    return s_x, s_y, w_x, w_y, facing
 
-    return abs(s_x) + abs(s_y)
+
+def waypoint_turn(state: Tuple[int, int, int, int, str], opcode: int,
+                  value: int) -> Tuple[int, int, int, int, str]:
+    """Return the (ship_x, ship_y, way_x, way_y, facing) state after turning value degrees left or right.
+    """
+    s_x, s_y, w_x, w_y, facing = state
+    direction = 'L' if opcode == TURN_LEFT else 'R'
+    facing, w_x, w_y = turn_ship_and_way(s_x, s_y, w_x, w_y, facing, direction, value)
+
+    return s_x, s_y, w_x, w_y, facing
+
+
+def waypoint_move(state: Tuple[int, int, int, int, str], opcode: int,
+                  value: int) -> Tuple[int, int, int, int, str]:
+    """Return the (ship_x, ship_y, way_x, way_y, facing) state after moving the waypoint along heading opcode.
+    """
+    s_x, s_y, w_x, w_y, facing = state
+    w_x, w_y = move(w_x, w_y, opcode, value)
+
+    return s_x, s_y, w_x, w_y, facing
 
 
 def turn_ship_and_way(s_x: int, s_y: int, w_x: int, w_y: int,
@@ -152,72 +209,23 @@ def turn_ship_and_way(s_x: int, s_y: int, w_x: int, w_y: int,
     >>> turn_ship_and_way(0, 0, 10, 1, 'W', 'R', 180)
     ('E', -10, -1)
     """
-    deg = DIRECTIONS_LETTER[facing]
     direc = 1 if direction == 'L' else -1
+    new_dir = DIRECTIONS_DEGREES[(DIRECTIONS_LETTER[facing] + direc * degrees) % 360]
+    logging.debug('direc: %s -- degrees: %s -- new_dir: %s', direc, degrees, new_dir)
 
-    deg += direc * degrees
-    logging.debug(f'deg: {deg}')
-
-    way_offset_x = w_x - s_x
-    way_offset_y = w_y - s_y
-
-    turns = -1 * direc * degrees // 90  # positive for left, negative for right
-    logging.debug(f'direc: {direc} -- degrees: {degrees} -- turns: {turns}')
-    if turns > 0:
-        for _ in range(turns):
-            way_offset_x, way_offset_y = way_offset_y, -way_offset_x
-    elif turns < 0:
-        for _ in range(0, turns, -1):
-            way_offset_x, way_offset_y = -way_offset_y, way_offset_x
-
-    while deg < 0:
-        deg += 360
-    while deg >= 360:
-        deg -= 360
-
-    new_dir = DIRECTIONS_DEGREES[deg]
+    way_offset_x, way_offset_y = rotate(w_x - s_x, w_y - s_y, direc * degrees)
 
     return (new_dir, s_x + way_offset_x, s_y + way_offset_y)
 
 
-def move_way(x: int, y: int, direction: str, value: int) -> Tuple[int, int]:
-    """Return new x and y incremented by the given direction and value.
-
-    Preconditions:
-        - len(direction) == 1
-        - value >= 0
-        - direction in {'N', 'S', 'E', 'W'}
-
-    >>> move_way(0, 0, 'N', 10)
-    (0, 10)
-    >>> move_way(0, 0, 'S', 10)
-    (0, -10)
-    >>> move_way(0, 0, 'W', 10)
-    (-10, 0)
-    """
-    if direction == 'N':
-        y += value
-    elif direction == 'E':
-        x += value
-    elif direction == 'S':
-        y -= value
-    elif direction == 'W':
-        x -= value
-    else:
-        logging.warning(f"Direction '{direction}' not valid.")
-
-    return x, y
-
-
-def move_ship_and_way(s_x: int, s_y: int, w_x: int, w_y: int) -> Tuple[int, int, int, int]:
-    """Return the new ship and waypoint xs and ys computed by moving the ship to the waypoint.
+def move_ship_and_way(s_x: int, s_y: int, w_x: int, w_y: int, times: int = 1) -> Tuple[int, int, int, int]:
+    """Return the new ship and waypoint xs and ys computed by moving the ship to the waypoint times times.
 
+    The waypoint keeps its offset from the ship, so this is a single scaled add.
     The returned tuple has the following format: (ship_x, ship_y, way_x, way_y)
 
     Preconditions:
-        - len(direction) == 1
-        - value >= 0
-        - direction in {'N', 'S', 'E', 'W'}
+        - times >= 0
 
     >>> move_ship_and_way(0, 0, 10, 1)
     (10, 1, 20, 2)
@@ -225,14 +233,70 @@ def move_ship_and_way(s_x: int, s_y: int, w_x: int, w_y: int) -> Tuple[int, int,
     (5, -1, 10, -2)
     >>> move_ship_and_way(10, 1, 20, 2)
     (20, 2, 30, 3)
+    >>> move_ship_and_way(0, 0, 10, 1, 10 ** 12)
+    (10000000000000, 1000000000000, 10000000000010, 1000000000001)
     """
     way_offset_x, way_offset_y = w_x - s_x, w_y - s_y
-    s_x, s_y = w_x, w_y
+    s_x, s_y = s_x + times * way_offset_x, s_y + times * way_offset_y
     w_x, w_y = s_x + way_offset_x, s_y + way_offset_y
 
     return s_x, s_y, w_x, w_y
 
 
+# Dispatch table from opcode to handler, used by navigate for the Part 2 rules
+WAYPOINT_ACTIONS = [waypoint_move, waypoint_move, waypoint_move, waypoint_move,
+                    waypoint_turn, waypoint_turn, waypoint_forward]
+
+
+def log_distance_waypoint(opcodes: List[int], values: List[int]) -> int:
+    """Return the Manhattan distance the ship ends up from the start, following the Part 2 rules.
+
+    >>> log_distance_waypoint(*decode_log(read_input('test1.txt')))
+    286
+    """
+    s_x, s_y, _, _, _ = navigate(opcodes, values, WAYPOINT_ACTIONS, (0, 0, 10, 1, 'E'))
+
+    return abs(s_x) + abs(s_y)
+
+
+def navigate_log(instructions: List[str], waypoint: bool = False) -> int:
+    """Return the Manhattan distance at the end of one ship's log (Part 2 rules if waypoint).
+
+    The log is decoded once, then measured by log_distance_ship or log_distance_waypoint.
+
+    >>> navigate_log(['F10', 'N3', 'F7', 'R90', 'F11'])
+    25
+    >>> navigate_log(['F10', 'N3', 'F7', 'R90', 'F11'], waypoint=True)
+    286
+    """
+    opcodes, values = decode_log(instructions)
+
+    if waypoint:
+        return log_distance_waypoint(opcodes, values)
+    else:
+        return log_distance_ship(opcodes, values)
+
+
+def navigate_logs(logs: List[List[str]], waypoint: bool = False, processes: Optional[int] = None) -> List[int]:
+    """Return the navigate_log distance of every ship's log, processing logs across worker processes.
+
+    Results are in the same order as logs.
+
+    >>> navigate_logs([read_input('test1.txt')] * 3, processes=1)
+    [25, 25, 25]
+    >>> navigate_logs([read_input('test1.txt')], waypoint=True, processes=1)
+    [286]
+    >>> navigate_logs([read_input('test1.txt')] * 3, waypoint=True, processes=2)
+    [286, 286, 286]
+    """
+    worker = partial(navigate_log, waypoint=waypoint)
+    if processes == 1:
+        return [worker(log) for log in logs]
+
+    with Pool(processes) as pool:
+        return pool.map(worker, logs)
+
+
 if __name__ == '__main__':
     # logging.basicConfig(level=logging.DEBUG)
     logging.basicConfig(level=logging.WARNING)
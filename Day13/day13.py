@@ -3,7 +3,7 @@
 from __future__ import annotations
 
 import logging
-from typing import List, Union
+from typing import List, Optional, Tuple, Union
 
 
 def read_input(filepath: str) -> List[str]:
@@ -43,14 +43,94 @@ def solve_part2(filepath: str) -> int:
 
     busses = [int(bus) if bus.isdigit() else bus for bus in input_strs[1].split(',')]
 
-    possible_timestamp = 0
-    step = 1
-    for i in range(len(busses)):
-        if busses[i] != 'x':
-            while (possible_timestamp + i) % busses[i] != 0:
-                possible_timestamp += step
-            step *= busses[i]
-    return possible_timestamp
+    timestamp = earliest_timestamp(busses)
+    return -1 if timestamp is None else timestamp
+
+
+def earliest_timestamp(busses: List[Union[int, str]]) -> Optional[int]:
+    """Return the earliest timestamp at which every bus departs at its offset, or None if there is none.
+
+    Bus IDs do not need to be pairwise coprime. The result is verified with
+    check_times; a timestamp that fails verification is logged and None is returned.
+
+    >>> earliest_timestamp([17, 'x', 13, 19])
+    3417
+    >>> earliest_timestamp([4, 'x', 6])
+    4
+    >>> earliest_timestamp([4, 6]) is None
+    True
+    """
+    congruences = [(-i, bus) for i, bus in enumerate(busses) if bus != 'x']
+
+    solution = solve_congruences(congruences)
+    if solution is None:
+        return None
+
+    timestamp = solution[0]
+    if not check_times(timestamp, busses):
+        logging.warning('Timestamp %s failed verification for busses %s.', timestamp, busses)
+        return None
+
+    return timestamp
+
+
+def extended_gcd(a: int, b: int) -> Tuple[int, int, int]:
+    """Return (g, x, y) such that g == gcd(a, b) and a * x + b * y == g.
+
+    >>> extended_gcd(240, 46)
+    (2, -9, 47)
+    """
+    old_r, r = a, b
+    old_x, x = 1, 0
+    old_y, y = 0, 1
+    while r:
+        q = old_r // r
+        old_r, r = r, old_r - q * r
+        old_x, x = x, old_x - q * x
+        old_y, y = y, old_y - q * y
+
+    return old_r, old_x, old_y
+
+
+def merge_congruences(r1: int, m1: int, r2: int, m2: int) -> Optional[Tuple[int, int]]:
+    """Return (r, m) such that t % m == r exactly when t % m1 == r1 % m1 and t % m2 == r2 % m2.
+
+    m is lcm(m1, m2) and 0 <= r < m. Returns None if no t satisfies both congruences.
+
+    >>> merge_congruences(0, 4, 4, 6)
+    (4, 12)
+    >>> merge_congruences(0, 4, 1, 6) is None
+    True
+    """
+    g, p, _ = extended_gcd(m1, m2)
+    if (r2 - r1) % g != 0:
+        return None
+
+    lcm = m1 // g * m2
+    # t = r1 + m1 * k, where m1 * k == r2 - r1 (mod m2)
+    k = (r2 - r1) // g * p % (m2 // g)
+
+    return (r1 + m1 * k) % lcm, lcm
+
+
+def solve_congruences(congruences: List[Tuple[int, int]]) -> Optional[Tuple[int, int]]:
+    """Return (r, m) where the solutions of every t % modulus == remainder are exactly t % m == r.
+
+    Congruences are given as (remainder, modulus) pairs and merged one at a
+    time, so the moduli can be arbitrary positive integers. Returns None if the
+    congruences are inconsistent.
+
+    >>> solve_congruences([(0, 7), (-1, 13), (-4, 59), (-6, 31), (-7, 19)])
+    (1068781, 3162341)
+    """
+    r, m = 0, 1
+    for remainder, modulus in congruences:
+        merged = merge_congruences(r, m, remainder, modulus)
+        if merged is None:
+            return None
+        r, m = merged
+
+    return r, m
 
 
 def check_times(possible_timestamp: int, busses: List[Union[int, str]]) -> bool:
@@ -3,57 +3,67 @@
 from __future__ import annotations
 
 from math import prod
-from typing import List
+from typing import Iterator, List, Tuple
 
+# Tuple[int, int]: (right movement, down movement)
+PART2_SLOPES = [(1, 1), (3, 1), (5, 1), (7, 1), (1, 2)]
 
-def read_input(filepath: str) -> List[str]:
-    """Return processed version of the puzzle input.
-    """
-    with open(filepath) as input_file:
-        return input_file.read().strip().split('\n')
 
+def iter_rows(filepath: str) -> Iterator[str]:
+    """Yield the rows of the map one at a time without holding the whole file.
 
-def solve_part1(filepath: str) -> int:
-    """Returns solution to Day 3 Part 1 problem.
+    Blank lines (such as a trailing newline) are skipped.
     """
-    rows = read_input(filepath)
+    with open(filepath) as input_file:
+        for line in input_file:
+            row = line.strip()
+            if row:
+                yield row
 
-    trees = 0
-    col_num = 0
-    for row_num in range(len(rows)):
-        if rows[row_num][col_num % len(rows[row_num])] == '#':
-            trees += 1
 
-        col_num += 3
+def count_trees(filepath: str, slopes: List[Tuple[int, int]]) -> List[int]:
+    """Returns the number of trees hit on each slope, in the same order as slopes.
 
-    return trees
+    All slopes are advanced together in a single pass over the map, so only the
+    current row is ever held in memory.
 
+    Preconditions:
+        - all(right >= 0 and down >= 1 for right, down in slopes)
 
-def solve_part2(filepath: str) -> int:
-    """Returns solution to Day 3 Part 2 problem.
+    >>> count_trees('test1.txt', [(1, 1), (3, 1), (5, 1), (7, 1), (1, 2)])
+    [2, 7, 3, 4, 2]
     """
-    rows = read_input(filepath)
+    trees = [0] * len(slopes)
+    for row_num, row in enumerate(iter_rows(filepath)):
+        width = len(row)
+        for i, (right, down) in enumerate(slopes):
+            if row_num % down == 0 and row[(row_num // down) * right % width] == '#':
+                trees[i] += 1
+
+    return trees
 
-    trees = []
 
-    # Tuple[int, int]: (right movement, down movement)
-    slopes = [(1, 1), (3, 1), (5, 1), (7, 1), (1, 2)]
-    for slope in slopes:
-        tree_count = 0
-        col_num = 0
-        row_num = 0
-        while row_num < len(rows):
-            if rows[row_num][col_num % len(rows[row_num])] == '#':
-                tree_count += 1
+def solve_part1(filepath: str) -> int:
+    """Returns solution to Day 3 Part 1 problem.
 
-            col_num += slope[0]
-            row_num += slope[1]
+    >>> solve_part1('test1.txt')
+    7
+    """
+    return count_trees(filepath, [(3, 1)])[0]
 
-        trees.append(tree_count)
 
-    return prod(trees)
+def solve_part2(filepath: str) -> int:
+    """Returns solution to Day 3 Part 2 problem.
+
+    >>> solve_part2('test1.txt')
+    336
+    """
+    return prod(count_trees(filepath, PART2_SLOPES))
 
 
 if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
+
     print(f'D3P1: {solve_part1("input.txt")}')
     print(f'D3P2: {solve_part2("input.txt")}')
@@ -3,63 +3,152 @@
 from __future__ import annotations
 
 import re
-from typing import Dict, List
+from functools import partial
+from itertools import chain, islice
+from multiprocessing import Pool
+from time import perf_counter
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
 
 REQUIRED_FIELDS = {'byr', 'iyr', 'eyr', 'hgt', 'hcl', 'ecl', 'pid'}
 EYE_COLOURS = {'amb', 'blu', 'brn', 'gry', 'grn', 'hzl', 'oth'}
 
+# Dict[field, rule]: see compile_rule for the keys a rule may use
+PASSPORT_SCHEMA = {'byr': {'regex': r'[0-9]{4}', 'range': (1920, 2002)},
+                   'iyr': {'regex': r'[0-9]{4}', 'range': (2010, 2020)},
+                   'eyr': {'regex': r'[0-9]{4}', 'range': (2020, 2030)},
+                   'hgt': {'units': {'cm': (150, 193), 'in': (59, 76)}},
+                   'hcl': {'regex': r'#[0-9a-f]{6}'},
+                   'ecl': {'enum': EYE_COLOURS},
+                   'pid': {'regex': r'[0-9]{9}'}}
 
-def read_input(filepath: str) -> List[Dict[str, str]]:
-    """Return processed version of the puzzle input.
-    """
-    with open(filepath) as input_file:
-        passports = input_file.read().strip().split('\n\n')
+# Dict[rule key, int]: relative cost of each kind of check, used to order rules
+RULE_COSTS = {'enum': 1, 'range': 2, 'regex': 3, 'units': 4}
 
-    passport_fields = []
-    passport_fields_split = []
-    passport_fields_dict = []
-    for passport in passports:
-        # Split fields for each passport
-        passport_fields.append(passport.replace('\n', ' ').split(' '))
 
-        # Split keys/values for each passport
-        passport_fields_split.append([fields.split(':') for fields in passport_fields[-1]])
+def iter_passports(filepath: str) -> Iterator[Dict[str, str]]:
+    """Yield each passport in the input as soon as its record is complete.
 
-        # Create dict of this passport's fields
-        passport_fields_dict.append({k: v for k, v in passport_fields_split[-1]})
+    Records are separated by blank lines and may span any number of lines, so
+    only the passport currently being read is held in memory.
+    """
+    with open(filepath) as input_file:
+        passport = {}  # Dict[str, str]
+        for line in input_file:
+            fields = line.split()
+            if not fields:
+                if passport:
+                    yield passport
+                    passport = {}
+                continue
 
-    return passport_fields_dict
+            for field in fields:
+                key, _, value = field.partition(':')
+                passport[key] = value
+
+        if passport:
+            yield passport
 
 
 def solve_part1(filepath: str) -> int:
     """Returns solution to Day 4 Part 1 problem.
     """
-    passports = read_input(filepath)
-
-    valid = 0
-    for i in range(len(passports)):
-        # Check validity
-        if all(field in passports[i] for field in REQUIRED_FIELDS):
-            valid += 1
-
-    return valid
+    return sum(REQUIRED_FIELDS.issubset(passport) for passport in iter_passports(filepath))
 
 
 def solve_part2(filepath: str) -> int:
     """Returns solution to Day 4 Part 2 problem.
     """
-    passports = read_input(filepath)
-    valid = 0
-    for i in range(len(passports)):
-        # Check validity
-        if valid_passport(passports[i]):
-            valid += 1
+    return sum(valid_passport(passport) for passport in iter_passports(filepath))
+
+
+def compile_rule(spec: Dict[str, Any]) -> Callable[[str], bool]:
+    """Return a function checking a single field value against its schema entry.
+
+    Supported keys in spec (all optional, checked in this order); any other key
+    raises ValueError:
+        - 'regex': the whole value must match this pattern.
+        - 'range': (low, high) inclusive bounds on the value as an integer.
+        - 'units': {suffix: (low, high)}; the value is a number followed by one
+          of the suffixes, and the number must lie within that suffix's bounds.
+        - 'enum': collection of the only allowed values.
+
+    >>> check = compile_rule({'regex': r'[0-9]{4}', 'range': (1920, 2002)})
+    >>> check('2002'), check('2003'), check('02002')
+    (True, False, False)
+    >>> check = compile_rule({'units': {'cm': (150, 193), 'in': (59, 76)}})
+    >>> check('60in'), check('190in'), check('190')
+    (True, False, False)
+    >>> compile_rule({'range': (0, 9)})('\u00b2')
+    False
+    >>> compile_rule({'regexp': r'[0-9]{9}'})
+    Traceback (most recent call last):
+    ...
+    ValueError: unknown rule keys: regexp
+    """
+    unknown = sorted(key for key in spec if key not in RULE_COSTS)
+    if unknown:
+        raise ValueError(f'unknown rule keys: {", ".join(unknown)}')
+
+    checks = []  # List[Callable[[str], bool]]
+
+    if 'regex' in spec:
+        checks.append(re.compile(spec['regex']).fullmatch)
+
+    if 'range' in spec:
+        low, high = spec['range']
+        number = re.compile(r'[0-9]+')
+        checks.append(lambda value: number.fullmatch(value) is not None and low <= int(value) <= high)
+
+    if 'units' in spec:
+        units = dict(spec['units'])
+        pattern = re.compile(r'([0-9]+)(' + '|'.join(re.escape(unit) for unit in units) + ')')
+
+        def check_units(value: str) -> bool:
+            match = pattern.fullmatch(value)
+            if match is None:
+                return False
+            low, high = units[match.group(2)]
+            return low <= int(match.group(1)) <= high
+
+        checks.append(check_units)
+
+    if 'enum' in spec:
+        checks.append(frozenset(spec['enum']).__contains__)
+
+    if len(checks) == 1:
+        return checks[0]
+
+    return lambda value: all(check(value) for check in checks)
+
+
+def compile_schema(schema: Dict[str, Dict[str, Any]]) -> List[Tuple[str, Callable[[str], bool]]]:
+    """Return the (field, check) pairs for every field in the schema.
+    """
+    return [(field, compile_rule(spec)) for field, spec in schema.items()]
+
+
+def build_validator(schema: Dict[str, Dict[str, Any]]) -> Callable[[Dict[str, str]], bool]:
+    """Return a function that checks a passport against the schema in a single pass.
+
+    Every field in the schema is required.
+    """
+    rules = compile_schema(schema)
+
+    def validator(passport: Dict[str, str]) -> bool:
+        for field, check in rules:
+            value = passport.get(field)
+            if value is None or not check(value):
+                return False
+        return True
+
+    return validator
 
-    return valid
+
+PASSPORT_VALIDATOR = build_validator(PASSPORT_SCHEMA)
 
 
 def valid_passport(passport: Dict[str, str]) -> bool:
-    """Return whether this passport is valid.
+    """Return whether this passport is valid according to PASSPORT_SCHEMA.
 
     Valid Passport Requirements (function returns True if all of these are true)
     - byr (Birth Year) - four digits; at least 1920 and at most 2002.
@@ -72,50 +161,147 @@ def valid_passport(passport: Dict[str, str]) -> bool:
     - ecl (Eye Color) - exactly one of: amb blu brn gry grn hzl oth.
     - pid (Passport ID) - a nine-digit number, including leading zeroes.
     - cid (Country ID) - ignored, missing or not.
+
+    >>> valid_passport({'pid': '087499704', 'hgt': '74in', 'ecl': 'grn', 'iyr': '2012',
+    ...                 'eyr': '2030', 'byr': '1980', 'hcl': '#623a2f'})
+    True
+    >>> valid_passport({'pid': '3556412378', 'hgt': '59cm', 'ecl': 'zzz', 'iyr': '2023',
+    ...                 'eyr': '2038', 'byr': '2007', 'hcl': '74454a'})
+    False
+    """
+    return PASSPORT_VALIDATOR(passport)
+
+
+def first_failing_field(passport: Dict[str, str],
+                        rules: List[Tuple[str, Callable[[str], bool]]]) -> Optional[str]:
+    """Return the first field (in rule order) that rejects this passport, or None if it is valid.
+    """
+    for field, check in rules:
+        value = passport.get(field)
+        if value is None or not check(value):
+            return field
+
+    return None
+
+
+def order_fields(schema: Dict[str, Dict[str, Any]], sample: List[Dict[str, str]]) -> List[str]:
+    """Return the schema's fields ordered so that cheap rules which reject often run first.
+
+    Each field is scored by its estimated cost (RULE_COSTS summed over its rule's
+    keys) divided by its rejection rate on the sample; rules that never reject go
+    last. Ties keep schema order, so the result is deterministic for a given sample.
+    """
+    if not sample:
+        return list(schema)
+
+    scores = {}  # Dict[str, float]
+    for field, check in compile_schema(schema):
+        rejected = sum(1 for passport in sample
+                       if field not in passport or not check(passport[field]))
+        cost = sum(RULE_COSTS[key] for key in schema[field])
+        scores[field] = cost * len(sample) / rejected if rejected else float('inf')
+
+    return sorted(schema, key=lambda field: scores[field])
+
+
+def audit_shard(schema: Dict[str, Dict[str, Any]], field_order: List[str],
+                passports: List[Dict[str, str]]) -> Tuple[int, Dict[str, int]]:
+    """Return the number of valid passports and the rejection count per field for one shard.
+
+    Each passport is first checked with the rules in field_order; only rejected
+    passports are re-checked in schema order, so the rejecting field reported is
+    independent of field_order. The schema is compiled inside the worker since
+    compiled rules cannot be pickled.
+    """
+    canonical_rules = compile_schema(schema)
+    rules_by_field = dict(canonical_rules)
+    ordered_rules = [(field, rules_by_field[field]) for field in field_order]
+
+    valid = 0
+    failures = {}  # Dict[str, int]
+    for passport in passports:
+        if first_failing_field(passport, ordered_rules) is None:
+            valid += 1
+        else:
+            field = first_failing_field(passport, canonical_rules)
+            failures[field] = failures.get(field, 0) + 1
+
+    return valid, failures
+
+
+def iter_shards(passports: Iterator[Dict[str, str]], shard_size: int) -> Iterator[List[Dict[str, str]]]:
+    """Yield consecutive lists of at most shard_size passports.
     """
+    shard = []  # List[Dict[str, str]]
+    for passport in passports:
+        shard.append(passport)
+        if len(shard) == shard_size:
+            yield shard
+            shard = []
 
-    # Check for all needed fields present
-    all_required_fields = all(field in passport for field in REQUIRED_FIELDS)
-    if not all_required_fields:
-        return False
+    if shard:
+        yield shard
 
-    # Check birth year
-    if not (1920 <= int(passport['byr']) <= 2002):
-        return False
 
-    # Check issue year
-    if not (2010 <= int(passport['iyr']) <= 2020):
-        return False
+def audit_passports(filepath: str, schema: Optional[Dict[str, Dict[str, Any]]] = None,
+                    processes: Optional[int] = None, shard_size: int = 10000,
+                    sample_size: int = 1000) -> Tuple[int, Dict[str, int]]:
+    """Return the number of valid passports and how many were rejected by each field.
 
-    # Check expiration year
-    if not (2020 <= int(passport['eyr']) <= 2030):
-        return False
+    Each invalid passport is attributed to its first failing field in schema
+    order. Rules are ordered cheapest-first using the first sample_size records
+    to speed up the valid/invalid decision, then shards of shard_size records are
+    validated across processes worker processes (processes=1 validates in this
+    process).
 
-    # Check height
-    if not passport['hgt'].endswith(('cm', 'in')):
-        return False
-    elif passport['hgt'].endswith('cm') and not (150 <= int(passport['hgt'][:-2]) <= 193):
-        return False
-    elif passport['hgt'].endswith('in') and not (59 <= int(passport['hgt'][:-2]) <= 76):
-        return False
+    >>> audit_passports('test1.txt', processes=1)
+    (4, {'byr': 1, 'eyr': 2, 'hcl': 1})
+    >>> audit_passports('test1.txt', processes=2, shard_size=3, sample_size=1)
+    (4, {'byr': 1, 'eyr': 2, 'hcl': 1})
+    """
+    if schema is None:
+        schema = PASSPORT_SCHEMA
 
-    # Check hair color
-    if not passport['hcl'].startswith('#'):
-        return False
-    elif not re.match(r'#([a-f]|[0-9]){6}', passport['hcl']):
-        return False
+    passports = iter_passports(filepath)
+    sample = list(islice(passports, sample_size))
+    field_order = order_fields(schema, sample)
+    shards = iter_shards(chain(sample, passports), shard_size)
+    worker = partial(audit_shard, schema, field_order)
 
-    # Check eye color
-    if passport['ecl'] not in EYE_COLOURS:
-        return False
+    valid = 0
+    failures = {}  # Dict[str, int]
+
+    def merge(results: Iterator[Tuple[int, Dict[str, int]]]) -> None:
+        nonlocal valid
+        for shard_valid, shard_failures in results:
+            valid += shard_valid
+            for field, count in shard_failures.items():
+                failures[field] = failures.get(field, 0) + count
+
+    if processes == 1:
+        merge(map(worker, shards))
+    else:
+        with Pool(processes) as pool:
+            merge(pool.imap_unordered(worker, shards))
+
+    return valid, dict(sorted(failures.items()))
 
-    # Check passport id
-    if not (len(passport['pid']) == 9 and passport['pid'].isdigit()):
-        return False
 
-    return True
+def measure_throughput(validator: Callable[[Dict[str, str]], bool],
+                       passports: List[Dict[str, str]]) -> float:
+    """Return how many passports per second the validator checks over the given records.
+    """
+    start = perf_counter()
+    for passport in passports:
+        validator(passport)
+    elapsed = perf_counter() - start
+
+    return len(passports) / elapsed if elapsed > 0 else float('inf')
 
 
 if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
+
     print(f'D4P1: {solve_part1("input.txt")}')
     print(f'D4P2: {solve_part2("input.txt")}')
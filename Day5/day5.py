@@ -2,36 +2,55 @@
 
 from __future__ import annotations
 
-from typing import List
+from multiprocessing import Pool
+from typing import Iterable, Iterator, List, Optional, Tuple
 
+# F/L take the lower half (0 bit), B/R take the upper half (1 bit)
+SEAT_TRANSLATION = str.maketrans('FBLR', '0101')
+COL_BITS = 3
 
-def read_input(filepath: str) -> List[int]:
-    """Return processed version of the puzzle input.
+
+def decode_seat(seat: str) -> int:
+    """Return the seat ID of a boarding pass.
+
+    The pass is a binary number with F/L as 0 and B/R as 1, so passes for planes
+    with any number of row or column bits decode the same way.
+
+    >>> decode_seat('FBFBBFFRLR')
+    357
+    >>> decode_seat('BBFFBBFRLL')
+    820
+    >>> decode_seat('BFRL')
+    10
     """
-    with open(filepath) as input_file:
-        seats = input_file.read().strip().split('\n')
+    return int(seat.translate(SEAT_TRANSLATION), 2)
 
-    ids = []
+
+def decode_seats(seats: Iterable[str]) -> Iterator[int]:
+    """Yield the seat ID of every boarding pass, skipping blank lines.
+    """
     for seat in seats:
-        upper_row = 128
-        lower_row = 1
-        for row_split in seat[:7]:
-            if row_split == 'F':
-                upper_row = (upper_row - lower_row) // 2 + lower_row
-            elif row_split == 'B':
-                lower_row = upper_row - (upper_row - lower_row) // 2
+        seat = seat.strip()
+        if seat:
+            yield decode_seat(seat)
 
-        upper_col = 8
-        lower_col = 1
-        for col_split in seat[-3:]:
-            if col_split == 'L':
-                upper_col = (upper_col - lower_col) // 2 + lower_col
-            elif col_split == 'R':
-                lower_col = upper_col - (upper_col - lower_col) // 2
 
-        ids.append((upper_row - 1) * 8 + (upper_col - 1))
+def split_seat_id(seat_id: int, col_bits: int = COL_BITS) -> Tuple[int, int]:
+    """Return the (row, column) of a seat ID for a plane with col_bits column bits.
 
-    return ids
+    >>> split_seat_id(357)
+    (44, 5)
+    >>> split_seat_id(10, 1)
+    (5, 0)
+    """
+    return seat_id >> col_bits, seat_id & ((1 << col_bits) - 1)
+
+
+def read_input(filepath: str) -> List[int]:
+    """Return processed version of the puzzle input.
+    """
+    with open(filepath) as input_file:
+        return list(decode_seats(input_file))
 
 
 def solve_part1(filepath: str) -> int:
@@ -45,17 +64,88 @@ def solve_part1(filepath: str) -> int:
 def solve_part2(filepath: str) -> int:
     """Returns solution to Day 5 Part 2 problem.
     """
-    ids = read_input(filepath)
+    gaps = find_missing_seats(filepath)
 
-    ids.sort()
-    min_id = ids[0]
-    for i in range(len(ids)):
-        if min_id + i != ids[i]:
-            return ids[i] - 1
+    return gaps[0] if gaps else -1
 
-    return -1
+
+def occupancy_bitmap(seats: Iterable[str]) -> bytearray:
+    """Return a bytearray with a 1 at the index of every seat ID on the passes.
+
+    The bitmap is sized to the plane, which is inferred from the length of the
+    first boarding pass (a pass with n characters addresses 2 ** n seats).
+    Raises ValueError if the passes are not all the same length.
+
+    >>> list(occupancy_bitmap(['FB', 'BB', '']))
+    [0, 1, 0, 1]
+    >>> occupancy_bitmap(['FB', 'BBF'])
+    Traceback (most recent call last):
+    ...
+    ValueError: boarding pass 'BBF' has 3 characters, expected 2
+    """
+    occupied = bytearray()
+    width = 0
+    for seat in seats:
+        seat = seat.strip()
+        if not seat:
+            continue
+
+        if not width:
+            width = len(seat)
+            occupied = bytearray(1 << width)
+        elif len(seat) != width:
+            raise ValueError(f'boarding pass {seat!r} has {len(seat)} characters, expected {width}')
+
+        occupied[decode_seat(seat)] = 1
+
+    return occupied
+
+
+def find_gaps(occupied: bytearray) -> List[int]:
+    """Return every empty seat ID whose two neighbouring IDs are both occupied.
+
+    >>> find_gaps(bytearray([0, 1, 0, 1, 1, 0, 1, 0, 0, 1]))
+    [2, 5]
+    """
+    gaps = []
+    i = occupied.find(b'\x01\x00\x01')
+    while i != -1:
+        gaps.append(i + 1)
+        i = occupied.find(b'\x01\x00\x01', i + 2)
+
+    return gaps
+
+
+def find_missing_seats(filepath: str) -> List[int]:
+    """Return the IDs of all empty seats with occupied neighbours on this flight's manifest.
+
+    Passes are streamed into an occupancy bitmap, so no list of IDs is built or sorted.
+    """
+    with open(filepath) as input_file:
+        return find_gaps(occupancy_bitmap(input_file))
+
+
+def find_missing_seats_many(filepaths: List[str], processes: Optional[int] = None) -> List[List[int]]:
+    """Return find_missing_seats for every manifest, processing manifests across worker processes.
+
+    Results are in the same order as filepaths; processes=1 processes the
+    manifests in this process.
+
+    >>> find_missing_seats_many(['test1.txt', 'test1.txt'], processes=1)
+    [[3, 6], [3, 6]]
+    >>> find_missing_seats_many(['test1.txt', 'test1.txt'], processes=2)
+    [[3, 6], [3, 6]]
+    """
+    if processes == 1:
+        return [find_missing_seats(filepath) for filepath in filepaths]
+
+    with Pool(processes) as pool:
+        return pool.map(find_missing_seats, filepaths)
 
 
 if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
+
     print(f'D5P1: {solve_part1("input.txt")}')
     print(f'D5P2: {solve_part2("input.txt")}')
@@ -2,29 +2,136 @@
 
 from __future__ import annotations
 
-from typing import List
+from multiprocessing import Pool
+from time import perf_counter
+from typing import Iterator, List, Optional, Tuple
 
+# Mask with one bit set for each of the 26 questions
+ALL_QUESTIONS = (1 << 26) - 1
 
-def read_input(filepath: str) -> List[str]:
-    """Return processed version of the puzzle input.
+
+def iter_groups(filepath: str) -> Iterator[List[str]]:
+    """Yield each group's answers (one string per person) as soon as the group is complete.
     """
     with open(filepath) as input_file:
-        return input_file.read().strip().split('\n\n')
+        group = []  # List[str]
+        for line in input_file:
+            person = line.strip().replace(' ', '')
+            if person:
+                group.append(person)
+            elif group:
+                yield group
+                group = []
+
+        if group:
+            yield group
+
+
+def answer_mask(answers: str) -> int:
+    """Return the answers as a bitmask, with bit 0 for question 'a' up to bit 25 for 'z'.
+
+    >>> answer_mask('abc')
+    7
+    >>> answer_mask('z')
+    33554432
+    """
+    mask = 0
+    for c in answers:
+        mask |= 1 << (ord(c) - 97)
 
+    return mask
 
-def solve_part1(filepath: str) -> int:
-    """Returns solution to Day 6 Part 1 problem.
+
+def popcount(mask: int) -> int:
+    """Return the number of set bits in mask.
+
+    >>> popcount(0b101101)
+    4
+    """
+    return bin(mask).count('1')
+
+
+def group_totals(group: List[str]) -> Tuple[int, int]:
+    """Return the number of questions anyone and everyone in the group answered "yes" to.
+
+    >>> group_totals(['ab', 'ac'])
+    (3, 1)
     """
-    groups = read_input(filepath)
+    anyone = 0
+    everyone = ALL_QUESTIONS
+    for person in group:
+        mask = answer_mask(person)
+        anyone |= mask
+        everyone &= mask
 
-    groups_yes = []  # List[Set[str]]
-    group_sums = []  # List[int]
-    for group in groups:
-        group = group.replace('\n', '').replace(' ', '')
-        groups_yes.append({question for question in group})
-        group_sums.append(len(groups_yes[-1]))
+    return popcount(anyone), popcount(everyone)
 
-    return sum(group_sums)
+
+def iter_group_totals(filepath: str) -> Iterator[Tuple[int, int]]:
+    """Yield the (anyone, everyone) totals of each group in a single pass over the file.
+    """
+    for group in iter_groups(filepath):
+        yield group_totals(group)
+
+
+def summarize_declarations(filepath: str) -> Tuple[int, int, int]:
+    """Return (number of groups, anyone total, everyone total) for one flight's declarations.
+    """
+    groups = anyone = everyone = 0
+    for group_anyone, group_everyone in iter_group_totals(filepath):
+        groups += 1
+        anyone += group_anyone
+        everyone += group_everyone
+
+    return groups, anyone, everyone
+
+
+def customs_totals(filepath: str) -> Tuple[int, int]:
+    """Return the summed "anyone" and "everyone" counts over all groups in one pass.
+
+    >>> customs_totals('test.txt')
+    (11, 6)
+    """
+    _, anyone, everyone = summarize_declarations(filepath)
+
+    return anyone, everyone
+
+
+def customs_totals_many(filepaths: List[str],
+                        processes: Optional[int] = None) -> Tuple[List[Tuple[int, int]], float]:
+    """Return customs_totals for every flight, and the throughput in groups per second.
+
+    Flights are processed across worker processes (processes=1 processes them in
+    this process); results are in the same order as filepaths.
+
+    >>> totals, throughput = customs_totals_many(['test.txt', 'test.txt'], processes=1)
+    >>> totals, throughput > 0
+    ([(11, 6), (11, 6)], True)
+    >>> totals, throughput = customs_totals_many(['test.txt', 'test.txt'], processes=2)
+    >>> totals, throughput > 0
+    ([(11, 6), (11, 6)], True)
+    """
+    start = perf_counter()
+    if processes == 1:
+        summaries = [summarize_declarations(filepath) for filepath in filepaths]
+    else:
+        with Pool(processes) as pool:
+            summaries = pool.map(summarize_declarations, filepaths)
+    elapsed = perf_counter() - start
+
+    groups = sum(summary[0] for summary in summaries)
+    throughput = groups / elapsed if elapsed > 0 else float('inf')
+
+    return [(anyone, everyone) for _, anyone, everyone in summaries], throughput
+
+
+def solve_part1(filepath: str) -> int:
+    """Returns solution to Day 6 Part 1 problem.
+
+    >>> solve_part1('test.txt')
+    11
+    """
+    return customs_totals(filepath)[0]
 
 
 def solve_part2(filepath: str) -> int:
@@ -33,22 +140,7 @@ def solve_part2(filepath: str) -> int:
     >>> solve_part2('test.txt')
     6
     """
-    groups = read_input(filepath)
-
-    group_sums = []  # List[int]
-    for group in groups:
-        people = group.replace(' ', '').split('\n')  # List[str]
-        counts = {}  # Dict[str, int]
-        for person in people:
-            for c in person:
-                if c in counts:
-                    counts[c] += 1
-                else:
-                    counts[c] = 1
-
-        group_sums.append(len([c for c in counts if counts[c] == len(people)]))
-
-    return sum(group_sums)
+    return customs_totals(filepath)[1]
 
 
 if __name__ == '__main__':
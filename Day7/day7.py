@@ -2,64 +2,308 @@
 
 from __future__ import annotations
 
+import random
 import re
-from typing import Dict, Optional
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+RULE_PATTERN = re.compile(r'(.+?) bags contain (.+)\.')
+CONTENT_PATTERN = re.compile(r'([0-9]+) (.+?) bags?(?:, |$)')
 
 
 def read_input(filepath: str) -> Dict[str, Optional[Dict[str, int]]]:
     """Return processed version of the puzzle input.
     """
+    bags_rules = {}  # Dict[str, Optional[Dict[str, int]]]
     with open(filepath) as input_file:
-        rules = input_file.read().strip().split('.\n')
+        for line in input_file:
+            line = line.strip()
+            if line:
+                bag, contents = parse_rule(line)
+                bags_rules[bag] = contents
 
-    bags_rules = {}  # Dict[str, Optional[Dict[str, int]]]
-    for rule in rules:
-        bag_rule = rule.split(' contain ')
-        contents = bag_rule[1].split(', ')
+    return bags_rules
 
-        possible_contents = {}  # Optional[Dict[str, int]]
-        if re.match(r'no other bags', contents[0]):
-            possible_contents = None
-        else:
-            for content in contents:
-                content = content.split(' ', 1)
-                possible_contents[content[1].rstrip('s').rstrip(' bag')] = int(content[0])
 
-        bags_rules[bag_rule[0].rstrip('s').rstrip(' bag')] = possible_contents
+def parse_rule(rule: str) -> Tuple[str, Optional[Dict[str, int]]]:
+    """Return the outer bag colour of a rule and its possible contents (None if it holds no bags).
 
-    return bags_rules
+    >>> parse_rule('light red bags contain 1 bright white bag, 2 muted yellow bags.')
+    ('light red', {'bright white': 1, 'muted yellow': 2})
+    >>> parse_rule('faded blues bags contain no other bags.')
+    ('faded blues', None)
+    """
+    match = RULE_PATTERN.fullmatch(rule)
+    if match is None:
+        raise ValueError(f'invalid bag rule: {rule!r}')
 
+    contents = {colour: int(n) for n, colour in CONTENT_PATTERN.findall(match.group(2))}
 
-def solve_part1(filepath: str) -> int:
-    """Returns solution to Day 7 Part 1 problem.
+    return match.group(1), contents or None
 
-    >>> solve_part1('test1.txt')
-    4
+
+class BagGraph:
+    """A graph of bag rules with a reverse index for "which bags can contain X" queries.
+
+    Each colour is interned to an integer ID, and edges are stored in lists indexed by ID.
+    Rules can be changed with set_rule and remove_rule, which update the cached
+    ancestor sets and content totals in place instead of rebuilding the graph.
+
+    Instance Attributes:
+        - colours: the colour of each bag ID
+        - ids: maps each colour to its bag ID
+        - contents: maps each bag ID to {inner bag ID: number of inner bags}
+        - containers: maps each bag ID to the set of bag IDs that directly contain it
+
+    Private Instance Attributes:
+        - _ancestors: cached results of ancestor_ids, keyed by bag ID
+        - _totals: cached result of content_totals, or None if not yet computed
+
+    Representation Invariants:
+        - len(self.colours) == len(self.contents) == len(self.containers)
+        - all(self.ids[colour] == i for i, colour in enumerate(self.colours))
     """
-    bags_rules = read_input(filepath)
+    colours: List[str]
+    ids: Dict[str, int]
+    contents: List[Dict[int, int]]
+    containers: List[Set[int]]
+    _ancestors: Dict[int, Set[int]]
+    _totals: Optional[List[Optional[int]]]
 
-    eventual_shiny_golds = 0
-    for bag in bags_rules:
-        if has_shiny_gold(bags_rules, bag):
-            eventual_shiny_golds += 1
+    def __init__(self, rules: Dict[str, Optional[Dict[str, int]]]) -> None:
+        """Initialize the graph and build its reverse index from the given rules.
+        """
+        self.colours = []
+        self.ids = {}
+        self.contents = []
+        self.containers = []
+        self._ancestors = {}
+        self._totals = None
+        for bag, contents in rules.items():
+            i = self.intern(bag)
+            if contents is not None:
+                for inner, n in contents.items():
+                    j = self.intern(inner)
+                    self.contents[i][j] = n
+                    self.containers[j].add(i)
 
-    return eventual_shiny_golds
+    def intern(self, bag: str) -> int:
+        """Return the ID of the given colour, adding it as an empty bag if it is new.
+        """
+        if bag not in self.ids:
+            self.ids[bag] = len(self.colours)
+            self.colours.append(bag)
+            self.contents.append({})
+            self.containers.append(set())
+            if self._totals is not None:
+                self._totals.append(0)
 
+        return self.ids[bag]
 
-def has_shiny_gold(all_rules: Dict[str, Optional[Dict[str, int]]], bag: str) -> bool:
-    """Returns whether the bag eventually has a shiny gold bag as a possible content.
+    def ancestor_ids(self, i: int) -> Set[int]:
+        """Return the IDs of every bag that can eventually contain bag ID i.
 
-    Recursively checks other bags.
+        Found with a single BFS over the reverse index; results are cached across queries.
+        """
+        if i not in self._ancestors:
+            found = set()
+            queue = deque([i])
+            while queue:
+                for container in self.containers[queue.popleft()]:
+                    if container not in found:
+                        found.add(container)
+                        queue.append(container)
+            self._ancestors[i] = found
 
-    Preconditions:
-        - bag in all_rules
-    """
-    if all_rules[bag] is None:
-        return False
-    elif 'shiny gold' in all_rules[bag]:
-        return True
+        return self._ancestors[i]
+
+    def ancestors(self, bag: str) -> Set[str]:
+        """Return every bag that can eventually contain the given bag.
+
+        >>> graph = BagGraph(read_input('test1.txt'))
+        >>> sorted(graph.ancestors('shiny gold'))
+        ['bright white', 'dark orange', 'light red', 'muted yellow']
+        """
+        if bag not in self.ids:
+            return set()
+
+        return {self.colours[i] for i in self.ancestor_ids(self.ids[bag])}
+
+    def count_containers(self, bag: str) -> int:
+        """Return how many bag colours can eventually contain the given bag.
+        """
+        return len(self.ancestor_ids(self.ids[bag])) if bag in self.ids else 0
+
+    def content_totals(self) -> List[Optional[int]]:
+        """Return the total number of bags inside every bag ID, computed in one topological pass.
+
+        Bags on a cycle, or containing one, have no finite total and are None.
+
+        >>> BagGraph({'a': {'b': 1}, 'b': {'a': 2}, 'c': {'a': 1}, 'd': {'e': 2}, 'e': None}).content_totals()
+        [None, None, None, 2, 0]
+        """
+        if self._totals is None:
+            totals = [None] * len(self.colours)
+            self.update_totals(totals, range(len(self.colours)))
+            self._totals = totals
+
+        return self._totals
+
+    def update_totals(self, totals: List[Optional[int]], affected: Iterable[int]) -> None:
+        """Recompute totals for the affected bag IDs.
+
+        Bags are processed innermost first, so each total is built from the
+        already-known totals of its contents. Bags outside affected must already
+        have correct totals. Bags on (or containing) a cycle are set to None.
+        """
+        # Number of inner bags per affected bag whose totals are not yet recomputed
+        pending = {i: 0 for i in affected}
+        for i in pending:
+            pending[i] = sum(1 for j in self.contents[i] if j in pending)
+            totals[i] = None
+        ready = deque(i for i, count in pending.items() if count == 0)
+
+        while ready:
+            i = ready.popleft()
+            inner_totals = [(n, totals[j]) for j, n in self.contents[i].items()]
+            if all(total is not None for _, total in inner_totals):
+                totals[i] = sum(n + n * total for n, total in inner_totals)
+            for container in self.containers[i]:
+                if container in pending:
+                    pending[container] -= 1
+                    if pending[container] == 0:
+                        ready.append(container)
+
+    def cycle_below(self, i: int) -> List[str]:
+        """Return the colours of the bags on a cycle that bag ID i is on or eventually contains.
 
-    return any(has_shiny_gold(all_rules, b) for b in all_rules[bag])
+        >>> graph = BagGraph({'a': {'b': 1}, 'b': {'a': 2}, 'c': {'a': 1}})
+        >>> graph.cycle_below(graph.ids['c'])
+        ['a', 'b']
+        """
+        below = {i}
+        stack = [i]
+        while stack:
+            for j in self.contents[stack.pop()]:
+                if j not in below:
+                    below.add(j)
+                    stack.append(j)
+
+        on_cycle = []
+        for start in below:
+            seen = set()
+            stack = list(self.contents[start])
+            while stack and start not in seen:
+                j = stack.pop()
+                if j not in seen:
+                    seen.add(j)
+                    stack.extend(self.contents[j])
+            if start in seen:
+                on_cycle.append(self.colours[start])
+
+        return sorted(on_cycle)
+
+    def content_counts(self) -> Dict[str, int]:
+        """Return the total number of bags inside every bag without a cycle below it, keyed by colour.
+        """
+        return {colour: total for colour, total in zip(self.colours, self.content_totals())
+                if total is not None}
+
+    def count_contents(self, bag: str) -> int:
+        """Return the number of bags within the specified bag.
+
+        Raises ValueError if the bag is on a cycle or eventually contains one.
+
+        >>> BagGraph(read_input('test2.txt')).count_contents('shiny gold')
+        126
+        >>> graph = BagGraph({'a': {'b': 1}, 'b': {'a': 2}, 'c': {'a': 1},
+        ...                   'shiny gold': {'d': 2}, 'd': None})
+        >>> graph.count_contents('shiny gold')
+        2
+        >>> graph.count_contents('c')
+        Traceback (most recent call last):
+        ...
+        ValueError: bag rules contain a cycle through: a, b
+        """
+        if bag not in self.ids:
+            return 0
+
+        i = self.ids[bag]
+        total = self.content_totals()[i]
+        if total is None:
+            raise ValueError(f'bag rules contain a cycle through: {", ".join(self.cycle_below(i))}')
+
+        return total
+
+    def set_rule(self, bag: str, contents: Optional[Dict[str, int]]) -> None:
+        """Add or replace the rule for the given bag, updating cached results incrementally.
+
+        Cached ancestor sets gain the new containers directly, and only the sets
+        that could lose members through a removed edge are evicted. Content totals
+        are recomputed for this bag and its ancestors only. Raises ValueError
+        (leaving the rules unchanged) if the new rule would create a cycle.
+
+        >>> graph = BagGraph(read_input('test1.txt'))
+        >>> graph.count_containers('shiny gold'), graph.count_contents('shiny gold')
+        (4, 32)
+        >>> graph.set_rule('faded blue', {'shiny gold': 1})
+        Traceback (most recent call last):
+        ...
+        ValueError: rule for 'faded blue' would create a cycle through 'shiny gold'
+        >>> graph.set_rule('dotted black', {'posh pink': 2})
+        >>> graph.count_contents('shiny gold')
+        64
+        >>> graph.set_rule('pale teal', {'shiny gold': 3})
+        >>> graph.remove_rule('bright white')
+        >>> sorted(graph.ancestors('shiny gold'))
+        ['dark orange', 'light red', 'muted yellow', 'pale teal']
+        """
+        i = self.intern(bag)
+        new = {self.intern(inner): n for inner, n in (contents or {}).items()}
+
+        above = self.ancestor_ids(i)
+        for j in new:
+            if j == i or j in above:
+                raise ValueError(f'rule for {bag!r} would create a cycle through {self.colours[j]!r}')
+
+        old = self.contents[i]
+        removed = [j for j in old if j not in new]
+        added = [j for j in new if j not in old]
+        for j in removed:
+            self.containers[j].discard(i)
+        for j in added:
+            self.containers[j].add(i)
+        self.contents[i] = new
+
+        # Removing i -> j may shrink the ancestors of j and of everything inside j
+        for q in [q for q, found in self._ancestors.items()
+                  if any(j == q or j in found for j in removed)]:
+            del self._ancestors[q]
+
+        # Adding i -> j makes i and everything above i ancestors of j and everything inside j
+        for q, found in self._ancestors.items():
+            if any(j == q or j in found for j in added):
+                found.add(i)
+                found.update(above)
+
+        if self._totals is not None:
+            self.update_totals(self._totals, above | {i})
+
+    def remove_rule(self, bag: str) -> None:
+        """Remove the rule for the given bag so that it contains no other bags.
+
+        The colour stays known to the graph, since other rules may still contain it.
+        """
+        self.set_rule(bag, None)
+
+
+def solve_part1(filepath: str) -> int:
+    """Returns solution to Day 7 Part 1 problem.
+
+    >>> solve_part1('test1.txt')
+    4
+    """
+    return BagGraph(read_input(filepath)).count_containers('shiny gold')
 
 
 def solve_part2(filepath: str) -> int:
@@ -68,21 +312,27 @@ def solve_part2(filepath: str) -> int:
     >>> solve_part2('test2.txt')
     126
     """
-    bags_rules = read_input(filepath)
+    return BagGraph(read_input(filepath)).count_contents('shiny gold')
 
-    return bag_count(bags_rules, 'shiny gold')
 
+def generate_rules(colours: int, max_contents: int = 4, seed: int = 0) -> Dict[str, Optional[Dict[str, int]]]:
+    """Return random acyclic bag rules over the given number of colours, for benchmarking.
 
-def bag_count(all_rules: Dict[str, Optional[Dict[str, int]]], bag: str) -> int:
-    """Returns number of bags within the specified bag.
+    Each bag only contains bags with a higher index, so the rules always form a DAG.
 
-    Recursively moves through bag nodes.
+    >>> rules = generate_rules(1000)
+    >>> len(rules)
+    1000
+    >>> BagGraph(rules).count_contents('bag 999')
+    0
     """
-    if all_rules[bag] is None:
-        return 0
-    else:
-        return sum(all_rules[bag][b] + all_rules[bag][b] * bag_count(all_rules, b)
-                   for b in all_rules[bag])
+    rng = random.Random(seed)
+    rules = {}  # Dict[str, Optional[Dict[str, int]]]
+    for i in range(colours):
+        inner = rng.sample(range(i + 1, colours), min(max_contents, colours - i - 1))
+        rules[f'bag {i}'] = {f'bag {j}': rng.randint(1, 5) for j in inner} or None
+
+    return rules
 
 
 if __name__ == '__main__':
@@ -2,7 +2,13 @@
 
 from __future__ import annotations
 
-from typing import List, Optional, Set
+from typing import Callable, List, Optional, Tuple
+
+ACC, JMP, NOP = 0, 1, 2
+OPCODES = {'acc': ACC, 'jmp': JMP, 'nop': NOP}
+
+# Called before each instruction runs as hook(i, opcode, argument, accumulator)
+Hook = Callable[[int, int, int, int], None]
 
 
 def read_input(filepath: str) -> List[str]:
@@ -12,33 +18,100 @@ def read_input(filepath: str) -> List[str]:
         return input_file.read().strip().split('\n')
 
 
-def solve_part1(filepath: str) -> int:
-    """Returns solution to Day 8 Part 1 problem.
+def decode_program(instructions: List[str]) -> Tuple[List[int], List[int]]:
+    """Return the opcodes and arguments of the program, decoded once up front.
 
-    >>> solve_part1('test1.txt')
-    5
+    >>> decode_program(['nop +0', 'acc +1', 'jmp -4'])
+    ([2, 0, 1], [0, 1, -4])
     """
-    instructions = read_input(filepath)
+    opcodes = []
+    arguments = []
+    for instruction in instructions:
+        operation, argument = instruction.split()
+        opcodes.append(OPCODES[operation])
+        arguments.append(int(argument))
+
+    return opcodes, arguments
+
+
+def run_program(opcodes: List[int], arguments: List[int],
+                flip: int = -1, hook: Optional[Hook] = None) -> Tuple[bool, int]:
+    """Run the program until it terminates or is about to repeat an instruction.
+
+    Returns (whether the program terminated, the accumulator value). The jmp/nop
+    at index flip (if any) is executed as the other operation, without copying
+    the program. hook is called before each executed instruction.
 
+    >>> opcodes, arguments = decode_program(read_input('test1.txt'))
+    >>> run_program(opcodes, arguments)
+    (False, 5)
+    >>> run_program(opcodes, arguments, flip=7)
+    (True, 8)
+    """
+    n = len(opcodes)
+    visited = bytearray(n)
     accumulator = 0
-    visited_instructions = set()
     i = 0
-    while i not in visited_instructions:
-        visited_instructions.add(i)
-        instruction = instructions[i].split(' ')
+    while 0 <= i < n and not visited[i]:
+        visited[i] = 1
+        opcode = opcodes[i]
+        if i == flip and opcode != ACC:
+            opcode = NOP if opcode == JMP else JMP
+        if hook is not None:
+            hook(i, opcode, arguments[i], accumulator)
+
+        if opcode == ACC:
+            accumulator += arguments[i]
+            i += 1
+        elif opcode == JMP:
+            i += arguments[i]
+        else:
+            i += 1
+
+    return i >= n, accumulator
+
+
+def instruction_counts(opcodes: List[int], arguments: List[int], flip: int = -1) -> List[int]:
+    """Return how many times each opcode (indexed by ACC, JMP, NOP) is executed.
 
-        direction = 1 if instruction[1][0] == '+' else -1
-        offset = int(instruction[1][1:])
+    >>> instruction_counts(*decode_program(read_input('test1.txt')))
+    [3, 3, 1]
+    """
+    counts = [0, 0, 0]
+
+    def count(i: int, opcode: int, argument: int, accumulator: int) -> None:
+        counts[opcode] += 1
+
+    run_program(opcodes, arguments, flip, count)
 
-        if instruction[0] == 'acc':
-            accumulator += direction * offset
-        elif instruction[0] == 'jmp':
-            i += direction * offset
-            i -= 1
+    return counts
 
-        i += 1
 
-    return accumulator
+def trace_program(opcodes: List[int], arguments: List[int], flip: int = -1) -> List[Tuple[int, int, int, int]]:
+    """Return the (index, opcode, argument, accumulator) of every executed instruction, in order.
+
+    >>> trace_program(*decode_program(['acc +2', 'jmp +1', 'acc -1']))
+    [(0, 0, 2, 0), (1, 1, 1, 2), (2, 0, -1, 2)]
+    """
+    trace = []
+
+    def record(i: int, opcode: int, argument: int, accumulator: int) -> None:
+        trace.append((i, opcode, argument, accumulator))
+
+    run_program(opcodes, arguments, flip, record)
+
+    return trace
+
+
+def solve_part1(filepath: str) -> int:
+    """Returns solution to Day 8 Part 1 problem.
+
+    >>> solve_part1('test1.txt')
+    5
+    """
+    opcodes, arguments = decode_program(read_input(filepath))
+
+    return run_program(opcodes, arguments)[1]
 
 
 def solve_part2(filepath: str) -> int:
@@ -47,57 +120,77 @@ def solve_part2(filepath: str) -> int:
     >>> solve_part2('test1.txt')
     8
     """
-    instructions = read_input(filepath)
+    opcodes, arguments = decode_program(read_input(filepath))
+
+    flip = find_repair(opcodes, arguments)
+    if flip is None:
+        return -1
 
-    return instruction_branch(instructions, set(), 0, 0, False)
+    terminated, accumulator = run_program(opcodes, arguments, flip=flip)
+    return accumulator if terminated else -1
 
 
-def instruction_branch(instructions: List[str], visited: Set[int],
-                       i: int, accumulator: int, changed: bool) -> Optional[int]:
-    """Recursively traverses through different instruction choices.
+def terminating_instructions(opcodes: List[int], arguments: List[int]) -> bytearray:
+    """Return a bytearray marking with 1 every instruction from which the unmodified program terminates.
 
-    Returns accumulator value if the program terminates by getting to the end of the instructions,
-    None if the program enters an infinite loop.
+    Found with a BFS backwards from the end of the program over reversed
+    control-flow edges (jumps past the end count as reaching the end).
+
+    >>> list(terminating_instructions(*decode_program(read_input('test1.txt'))))
+    [0, 0, 0, 0, 0, 0, 0, 0, 1]
+    """
+    n = len(opcodes)
+    predecessors = [[] for _ in range(n + 1)]  # List[List[int]]
+    for i in range(n):
+        target = i + arguments[i] if opcodes[i] == JMP else i + 1
+        if target >= 0:
+            predecessors[min(target, n)].append(i)
+
+    reaches_end = bytearray(n + 1)
+    reaches_end[n] = 1
+    stack = [n]
+    while stack:
+        for i in predecessors[stack.pop()]:
+            if not reaches_end[i]:
+                reaches_end[i] = 1
+                stack.append(i)
+
+    return reaches_end[:n]
+
+
+def find_repair(opcodes: List[int], arguments: List[int]) -> Optional[int]:
+    """Return the index of the jmp/nop whose flip makes the program terminate, or None.
+
+    Walks the original execution path once; the first jmp/nop on it whose flipped
+    successor can reach the end is the repair, so the search is O(n). This relies
+    on the original program looping, so a program that already terminates has no
+    repair.
+
+    >>> find_repair(*decode_program(read_input('test1.txt')))
+    7
+    >>> find_repair(*decode_program(['nop +0', 'acc +1', 'acc +2'])) is None
+    True
     """
-    if i in visited:
+    n = len(opcodes)
+    reaches_end = terminating_instructions(opcodes, arguments) + b'\x01'
+    if reaches_end[0]:
         return None
-    elif i >= len(instructions):
-        return accumulator
-
-    visited = visited.copy()
-    visited.add(i)
-
-    instruction = instructions[i].split(' ')
-
-    direction = 1 if instruction[1][0] == '+' else -1
-    offset = int(instruction[1][1:])
-
-    # Two branches: no change, change (nop -> jmp OR jmp -> nop)
-    if instruction[0] == 'acc':
-        return instruction_branch(instructions, visited, i + 1, accumulator + direction * offset, changed)
-    elif changed:  # If previously changed, can't make another change
-        if instruction[0] == 'jmp':
-            return instruction_branch(instructions, visited, i + direction * offset, accumulator, changed)
-        else:  # instruction[0] == 'nop'
-            return instruction_branch(instructions, visited, i + 1, accumulator, changed)
-    else:  # change is False
-        # Try keeping instruction same and swapped operation
-        if instruction[0] == 'jmp':
-            branch_no_change = instruction_branch(instructions, visited, i + direction * offset, accumulator, False)
-            branch_change = instruction_branch(instructions, visited, i + 1, accumulator, True)
-        else:
-            branch_no_change = instruction_branch(instructions, visited, i + 1, accumulator, False)
-            branch_change = instruction_branch(instructions, visited, i + direction * offset, accumulator, True)
-
-        # Evaluate branches to find best
-        if branch_no_change is None and branch_change is None:
-            return None
-        elif branch_no_change is not None and branch_change is None:
-            return branch_no_change
-        elif branch_no_change is None and branch_change is not None:
-            return branch_change
+
+    visited = bytearray(n)
+    i = 0
+    while 0 <= i < n and not visited[i]:
+        visited[i] = 1
+        opcode = opcodes[i]
+        if opcode == JMP:
+            if reaches_end[i + 1]:
+                return i
+            i += arguments[i]
         else:
-            return branch_no_change
+            if opcode == NOP and 0 <= i + arguments[i] and reaches_end[min(i + arguments[i], n)]:
+                return i
+            i += 1
+
+    return None
 
 
 if __name__ == '__main__':
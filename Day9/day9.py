@@ -2,7 +2,8 @@
 
 from __future__ import annotations
 
-from typing import List
+from collections import Counter, deque
+from typing import Iterable, Iterator, List, Optional, Tuple
 
 
 def read_input(filepath: str) -> List[int]:
@@ -14,37 +15,56 @@ def read_input(filepath: str) -> List[int]:
     return [int(n) for n in nums]
 
 
-def solve_part1(filepath: str, preamble_len: int) -> int:
-    """Returns solution to Day 9 Part 1 problem.
+def iter_numbers(filepath: str) -> Iterator[int]:
+    """Yield the numbers in the input one at a time without reading the whole file.
+    """
+    with open(filepath) as input_file:
+        for line in input_file:
+            line = line.strip()
+            if line:
+                yield int(line)
 
-    >>> solve_part1('test1.txt', 5)
-    127
+
+def find_invalid(nums: Iterable[int], preamble_len: int) -> Optional[int]:
+    """Return the first number that is not the sum of two different numbers in the window before it.
+
+    The window is kept as a deque plus a count of each value in it, updated as
+    each number slides in and out, so each check is O(preamble_len) and nums can
+    be any iterable (including a stream).
+
+    >>> find_invalid([1, 2, 3, 5, 8, 20], 3)
+    20
+    >>> find_invalid([5, 5, 10], 2)
+    10
+    >>> find_invalid([1, 2, 3, 5, 8, 13], 2) is None
+    True
     """
-    nums = read_input(filepath)
+    window = deque()
+    counts = Counter()  # Counter[int]
+    for num in nums:
+        if len(window) == preamble_len:
+            if not any(num - n != n and counts[num - n] for n in counts):
+                return num
+            oldest = window.popleft()
+            counts[oldest] -= 1
+            if counts[oldest] == 0:
+                del counts[oldest]
 
-    for i in range(preamble_len, len(nums)):
-        window = nums[i - preamble_len:i]
-        if not sum_of_any(window, nums[i]):
-            return nums[i]
+        window.append(num)
+        counts[num] += 1
 
-    return -1
+    return None
 
 
-def sum_of_any(nums: List[int], num: int) -> bool:
-    """Returns whether the given num can be written as the sum of
-    any two unique numbers in nums.
+def solve_part1(filepath: str, preamble_len: int) -> int:
+    """Returns solution to Day 9 Part 1 problem.
 
-    >>> sum_of_any([1, 2, 3, 4, 5, 23, 24, 25], 26)
-    True
-    >>> sum_of_any([1, 2, 3, 4, 5], 1)
-    False
+    >>> solve_part1('test1.txt', 5)
+    127
     """
-    for n in nums:
-        possible_match = num - n
-        if possible_match != n and possible_match in nums:
-            return True
+    invalid = find_invalid(iter_numbers(filepath), preamble_len)
 
-    return False
+    return -1 if invalid is None else invalid
 
 
 def solve_part2(filepath: str, preamble_len: int) -> int:
@@ -55,33 +75,75 @@ def solve_part2(filepath: str, preamble_len: int) -> int:
     """
     nums = read_input(filepath)
 
-    num_to_find = solve_part1(filepath, preamble_len)
-    ind_num_to_find = nums.index(num_to_find)
+    num_to_find = find_invalid(nums, preamble_len)
+    if num_to_find is None:
+        return -1
+
+    if min(nums) >= 0:
+        found = find_contiguous_range(nums, num_to_find)
+    else:
+        found = find_contiguous_range_prefix(nums, num_to_find)
 
-    for i in range(ind_num_to_find - 1):
-        for j in range(2, ind_num_to_find - i):
-            window = nums[i:i + j]
-            if len(window) > 2 and sum_to_num(window, num_to_find):
-                return min(window) + max(window)
+    if found is None:
+        return -1
 
-    return -1
+    window = nums[found[0]:found[1]]
+    return min(window) + max(window)
 
 
-def sum_to_num(nums: List[int], num: int) -> bool:
-    """Returns whether the sum of the numbers in nums is num.
+def find_contiguous_range(nums: List[int], num: int) -> Optional[Tuple[int, int]]:
+    """Return (start, end) such that nums[start:end] has at least two numbers summing to num, or None.
 
-    >>> sum_to_num([1, 4, 5], 10)
+    Uses two pointers over a running sum, so it runs in linear time.
+
+    Preconditions:
+        - all(n >= 0 for n in nums)
+
+    >>> find_contiguous_range([35, 20, 15, 25, 47, 40, 62, 55, 65, 95, 102, 117], 127)
+    (2, 6)
+    >>> find_contiguous_range([127, 1, 2], 127) is None
     True
-    >>> sum_to_num([1, 2, 3, 4, 5], 4)
-    False
     """
+    start = 0
     total = 0
+    for end in range(len(nums)):
+        total += nums[end]
+        while total > num and start < end:
+            total -= nums[start]
+            start += 1
+        # A single number equal to num does not count as a range
+        if total == num and end - start >= 1:
+            return start, end + 1
+
+    return None
+
+
+def find_contiguous_range_prefix(nums: List[int], num: int) -> Optional[Tuple[int, int]]:
+    """Return (start, end) such that nums[start:end] has at least two numbers summing to num, or None.
+
+    Keeps a hash map from each prefix sum to its first index, so it runs in
+    linear time and also works when nums contains negative numbers.
+
+    >>> find_contiguous_range_prefix([4, -3, 10, -2, 8], 5)
+    (1, 4)
+    >>> find_contiguous_range_prefix([5, 1, -1], 5)
+    (0, 3)
+    >>> find_contiguous_range_prefix([5], 5) is None
+    True
+    """
+    first_index = {}  # Dict[int, int]: prefix sum -> first index it appears at
+    prefixes = [0]
     for n in nums:
-        total += n
-        if total > num:
-            return False
+        prefixes.append(prefixes[-1] + n)
+
+    for end in range(2, len(prefixes)):
+        # Only ranges with at least two numbers may start at end - 2 or earlier
+        first_index.setdefault(prefixes[end - 2], end - 2)
+        start = first_index.get(prefixes[end] - num)
+        if start is not None:
+            return start, end
 
-    return total == num
+    return None
 
 
 if __name__ == '__main__':